@@ -1,27 +1,148 @@
-from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi import FastAPI, HTTPException, Request, Header, Response, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from fastapi.routing import APIRoute
 import uvicorn
+import asyncio
+import orjson
+import zstandard
+import logging
+from contextlib import asynccontextmanager
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.services.aicode_service import generate_code, generate_unit_tests, generate_documentation
+from backend.services.aicode_service import generate_code, stream_code, generate_unit_tests, generate_documentation
 from backend.services.file_handler import copy_to_clipboard, save_to_file
+from backend.services.cache import response_cache
+from backend.services.batcher import completion_batcher
+from backend.services.openai_client import async_client, probe_rate_limits
+from backend.services.tokenizer import warm_encoder
 from backend.models.schemas import (
     CodeGenerationRequest, CodeGenerationResponse,
     TestGenerationRequest, TestGenerationResponse,
     DocumentationRequest, DocumentationResponse,
+    TestsAndDocsRequest, TestsAndDocsResponse,
     FileOperationRequest, FileOperationResponse
 )
-from backend.config.settings import settings
+from backend.config.settings import Settings, settings, get_settings
+from backend.config.logging_config import configure_logging
 
 # NEW IMPORTS for webhook functionality
 from backend.services.git_service import github_service
 from backend.services.review_service import review_service
-from typing import Optional
+from backend.services.review_cache import exact_review_cache, review_cache
+from typing import Optional, Dict, Any, Callable, Tuple
 
-app = FastAPI(title="AI Code Generator & Review API", version="2.0.0")
+logger = logging.getLogger(__name__)
+
+
+class ORJSONRequest(Request):
+    """Request whose JSON body is decoded with orjson."""
+    
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+
+class ORJSONRoute(APIRoute):
+    """Route that hands endpoints an ORJSONRequest, so request bodies parse with orjson."""
+    
+    def get_route_handler(self) -> Callable:
+        original_handler = super().get_route_handler()
+        
+        async def handler(request: Request) -> Response:
+            return await original_handler(ORJSONRequest(request.scope, request.receive))
+        
+        return handler
+
+
+class ZstdRequestMiddleware:
+    """
+    Decompress request bodies sent with Content-Encoding: zstd.
+    
+    LOGIC: The frontend compresses large bodies (source code can be tens
+    of KB); this unwraps them before routing, so endpoints see plain JSON.
+    """
+    
+    # Refuse bodies that would decompress to more than this
+    max_body_size = 32 * 1024 * 1024
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (b"content-encoding", b"zstd") not in scope["headers"]:
+            await self.app(scope, receive, send)
+            return
+        
+        # Read the whole compressed body
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        
+        try:
+            compressed = b"".join(chunks)
+            size = zstandard.frame_content_size(compressed)
+            if size > self.max_body_size:
+                raise zstandard.ZstdError("decompressed body too large")
+            body = zstandard.ZstdDecompressor().decompress(compressed, max_output_size=self.max_body_size)
+        except zstandard.ZstdError as e:
+            response = ORJSONResponse({"detail": f"Invalid zstd body: {e}"}, status_code=400)
+            await response(scope, receive, send)
+            return
+        
+        headers = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        headers.append((b"content-length", str(len(body)).encode()))
+        
+        body_sent = False
+        
+        async def receive_decompressed():
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        
+        await self.app(dict(scope, headers=headers), receive_decompressed, send)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the queued log listener, load the tokenizer and size the OpenAI
+    rate limiter on startup; stop the batcher, write the review cache,
+    close pooled clients and flush logs on shutdown.
+    """
+    listener = configure_logging(settings.log_level)
+    # Load the tokenizer off the event loop (tiktoken may download its BPE file)
+    await warm_encoder(settings.model_name)
+    if settings.openai_api_key and settings.probe_rate_limits:
+        await probe_rate_limits()
+    yield
+    await completion_batcher.close()
+    if review_cache is not None:
+        await review_cache.close()
+    await async_client.close()
+    await github_service.close()
+    listener.stop()
+
+
+app = FastAPI(
+    title="AI Code Generator & Review API",
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+app.router.route_class = ORJSONRoute
 
 # Add CORS middleware
 app.add_middleware(
@@ -31,6 +152,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ZstdRequestMiddleware)
 
 
 # ============================================================================
@@ -38,40 +160,92 @@ app.add_middleware(
 # ============================================================================
 
 @app.post("/generate-code", response_model=CodeGenerationResponse)
-async def generate_code_endpoint(request: CodeGenerationRequest):
+async def generate_code_endpoint(request: CodeGenerationRequest, response: Response):
     """Generate code based on user query and language."""
     try:
-        code = generate_code(request.query, request.language)
+        code, hit = await response_cache.get_or_generate(
+            "generate-code", request.language, request.query,
+            lambda: generate_code(request.query, request.language)
+        )
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
         return CodeGenerationResponse(code=code)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/generate-code/stream")
+async def generate_code_stream_endpoint(request: CodeGenerationRequest):
+    """
+    Stream generated code as plain text while the model is still writing it.
+    
+    Shares the /generate-code cache: hits are sent in one piece, and
+    completed streams are cached for both endpoints.
+    """
+    chunks, hit = await response_cache.get_or_stream(
+        "generate-code", request.language, request.query,
+        lambda: stream_code(request.query, request.language)
+    )
+    return StreamingResponse(
+        chunks,
+        media_type="text/plain; charset=utf-8",
+        headers={"X-Cache": "HIT" if hit else "MISS"}
+    )
+
+
 @app.post("/generate-tests", response_model=TestGenerationResponse)
-async def generate_tests_endpoint(request: TestGenerationRequest):
+async def generate_tests_endpoint(request: TestGenerationRequest, response: Response):
     """Generate unit tests for the provided code."""
     try:
-        tests = generate_unit_tests(request.code, request.language)
+        tests, hit = await response_cache.get_or_generate(
+            "generate-tests", request.language, request.code,
+            lambda: generate_unit_tests(request.code, request.language)
+        )
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
         return TestGenerationResponse(tests=tests)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/generate-documentation", response_model=DocumentationResponse)
-async def generate_documentation_endpoint(request: DocumentationRequest):
+async def generate_documentation_endpoint(request: DocumentationRequest, response: Response):
     """Generate documentation for the provided code."""
     try:
-        documentation = generate_documentation(request.code, request.language)
+        documentation, hit = await response_cache.get_or_generate(
+            "generate-documentation", request.language, request.code,
+            lambda: generate_documentation(request.code, request.language)
+        )
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
         return DocumentationResponse(documentation=documentation)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/generate-tests-and-docs", response_model=TestsAndDocsResponse)
+async def generate_tests_and_docs_endpoint(request: TestsAndDocsRequest, response: Response):
+    """Generate unit tests and documentation for the same code concurrently."""
+    try:
+        # Same cache entries as /generate-tests and /generate-documentation
+        (tests, tests_hit), (documentation, docs_hit) = await asyncio.gather(
+            response_cache.get_or_generate(
+                "generate-tests", request.language, request.code,
+                lambda: generate_unit_tests(request.code, request.language)
+            ),
+            response_cache.get_or_generate(
+                "generate-documentation", request.language, request.code,
+                lambda: generate_documentation(request.code, request.language)
+            )
+        )
+        response.headers["X-Cache"] = "HIT" if tests_hit and docs_hit else "MISS"
+        return TestsAndDocsResponse(tests=tests, documentation=documentation)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/copy-to-clipboard", response_model=FileOperationResponse)
 async def copy_to_clipboard_endpoint(request: FileOperationRequest):
     """Copy code to clipboard."""
     try:
-        message = copy_to_clipboard(request.code)
+        message = await copy_to_clipboard(request.code)
         return FileOperationResponse(message=message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -81,7 +255,7 @@ async def copy_to_clipboard_endpoint(request: FileOperationRequest):
 async def save_to_file_endpoint(request: FileOperationRequest):
     """Save code to file."""
     try:
-        message = save_to_file(request.code, request.language or "txt")
+        message = await save_to_file(request.code, request.language or "txt")
         return FileOperationResponse(message=message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -113,42 +287,127 @@ async def root():
 
 
 @app.get("/status")
-async def system_status():
+async def system_status(config: Settings = Depends(get_settings)):
     """Check system configuration status."""
     return {
-        "openai_configured": settings.openai_api_key is not None,
-        "github_configured": settings.github_token is not None,
-        "webhook_configured": settings.github_webhook_secret is not None,
-        "backend_url": f"http://{settings.backend_host}:{settings.backend_port}"
+        "openai_configured": config.openai_api_key is not None,
+        "github_configured": config.github_token is not None,
+        "webhook_configured": config.github_webhook_secret is not None,
+        "backend_url": f"http://{config.backend_host}:{config.backend_port}",
+        "review_cache": exact_review_cache.stats()
     }
 
 
+async def _process_pr(pr_data: Dict[str, Any]) -> None:
+    """
+    Fetch, review and comment on a PR (webhook steps 6-10).
+    
+    Runs as a background task after the webhook has been acknowledged,
+    so failures are logged instead of being returned to GitHub.
+    """
+    repo_owner = pr_data["repo_owner"]
+    repo_name = pr_data["repo_name"]
+    pr_number = pr_data["pr_number"]
+    head_sha = pr_data.get("head_sha")
+    
+    # STEP 6 & 7: Fetch PR diff and files metadata concurrently
+    pr_diff, pr_files = await asyncio.gather(
+        github_service.get_pr_diff(
+            repo_owner=repo_owner,
+            repo_name=repo_name,
+            pr_number=pr_number,
+            head_sha=head_sha
+        ),
+        github_service.get_pr_files(
+            repo_owner=repo_owner,
+            repo_name=repo_name,
+            pr_number=pr_number,
+            head_sha=head_sha
+        ),
+        return_exceptions=True
+    )
+    
+    # The diff (the actual code changes) is required
+    if isinstance(pr_diff, Exception):
+        logger.error("❌ Failed to fetch diff: %s", pr_diff)
+        return
+    logger.info("📄 Fetched diff: %d characters", len(pr_diff))
+    
+    # Files metadata is optional
+    if isinstance(pr_files, Exception):
+        logger.error("❌ Failed to fetch files: %s", pr_files)
+        pr_files = []
+    else:
+        logger.info("📂 Files changed: %d", len(pr_files))
+    
+    # STEP 8: AI reviews the code
+    logger.info("🤖 Starting AI code review...")
+    try:
+        review_feedback = await review_service.review_pr_diff(pr_diff, pr_files)
+        logger.info("✅ AI review completed: %s", review_feedback["overall_assessment"])
+    except Exception as e:
+        logger.error("❌ AI review failed: %s", e)
+        return
+    
+    # STEP 9: Format feedback as GitHub comments
+    inline_comments = github_service.create_inline_comments(review_feedback)
+    logger.info("💬 Created %d inline comments", len(inline_comments))
+    
+    # STEP 10: Post review back to GitHub
+    try:
+        success = await github_service.post_pr_review(
+            repo_owner=repo_owner,
+            repo_name=repo_name,
+            pr_number=pr_number,
+            comments=inline_comments,
+            review_body=review_feedback["summary"]
+        )
+        
+        if success:
+            logger.info("✅ Review posted to GitHub successfully! (%d issues)", len(review_feedback["issues"]))
+        else:
+            logger.error("❌ Failed to post review")
+            
+    except Exception as e:
+        logger.error("❌ Failed to post review: %s", e)
+
+
 @app.post("/webhook/github")
 async def github_webhook(
     request: Request,
-    x_hub_signature_256: Optional[str] = Header(None)
+    response: Response,
+    background_tasks: BackgroundTasks,
+    x_hub_signature_256: Optional[str] = Header(None),
+    x_github_event: Optional[str] = Header(None)
 ):
     """
     GitHub webhook endpoint for PR code reviews.
     
     FLOW:
     1. GitHub sends PR event → This endpoint
+       (other event types are skipped before the body is even read)
     2. Verify signature (security)
     3. Parse PR data
-    4. Fetch code changes
-    5. AI reviews code
-    6. Post review back to GitHub
+    4. ACK GitHub with 202 Accepted
+    5. In the background: fetch code changes, AI reviews code,
+       post review back to GitHub (see _process_pr)
     
     MOBILE DEV ANALOGY:
     Like receiving a push notification, verifying it's real,
     processing the data, and sending a response back.
     """
     
+    # STEP 0: Skip non-PR events up front. Nothing is trusted from the
+    # header - it can only make us do less work, never skip verification.
+    if x_github_event != "pull_request":
+        logger.debug("⏭️  Skipping %s event", x_github_event)
+        return {"skipped": x_github_event}
+    
     try:
         # STEP 1: Get raw request body for signature verification
         payload_body = await request.body()
         
-        print("📥 Webhook received from GitHub")
+        logger.info("📥 Webhook received from GitHub")
         
         # STEP 2: Verify this request actually came from GitHub
         try:
@@ -156,28 +415,25 @@ async def github_webhook(
                 payload_body=payload_body,
                 signature_header=x_hub_signature_256
             )
-            print("✅ Webhook signature verified")
+            logger.debug("✅ Webhook signature verified")
         except ValueError as e:
-            print(f"❌ Signature verification failed: {e}")
+            logger.warning("❌ Signature verification failed: %s", e)
             raise HTTPException(status_code=401, detail="Invalid signature")
         
-        # STEP 3: Parse the JSON payload
-        payload = await request.json()
+        # STEP 3: Parse the JSON payload (reuse the bytes we already read)
+        payload = orjson.loads(payload_body)
 
-        print(f"🔍 DEBUG - Webhook Action: {payload.get('action', 'NO ACTION')}")
-        print(f"🔍 DEBUG - Event Keys: {list(payload.keys())}")
-        print(f"🔍 DEBUG - Has pull_request? {'pull_request' in payload}")
+        logger.debug("🔍 Webhook Action: %s", payload.get("action", "NO ACTION"))
+        logger.debug("🔍 Event Keys: %s", list(payload.keys()))
+        logger.debug("🔍 Has pull_request? %s", "pull_request" in payload)
 
         # STEP 4: Extract PR information
         pr_data = github_service.parse_webhook_pr(payload)
         
-        # STEP 4: Extract PR information
-        pr_data = github_service.parse_webhook_pr(payload)
-        
         if not pr_data:
             return {"message": "❌ Invalid webhook payload"}
         
-        print(f"📋 PR Data: {pr_data}")
+        logger.debug("📋 PR Data: %s", pr_data)
         
         # STEP 5: Check if this is a PR event we care about
         action = pr_data["action"]
@@ -189,76 +445,23 @@ async def github_webhook(
                 "action": action
             }
         
-        print(f"🔍 Processing PR #{pr_data['pr_number']} - Action: {action}")
-        
-        # STEP 6: Fetch PR diff (the actual code changes)
-        try:
-            pr_diff = github_service.get_pr_diff(
-                repo_owner=pr_data["repo_owner"],
-                repo_name=pr_data["repo_name"],
-                pr_number=pr_data["pr_number"]
-            )
-            print(f"📄 Fetched diff: {len(pr_diff)} characters")
-        except Exception as e:
-            print(f"❌ Failed to fetch diff: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to fetch PR diff: {e}")
-        
-        # STEP 7: Fetch PR files metadata
-        try:
-            pr_files = github_service.get_pr_files(
-                repo_owner=pr_data["repo_owner"],
-                repo_name=pr_data["repo_name"],
-                pr_number=pr_data["pr_number"]
-            )
-            print(f"📂 Files changed: {len(pr_files)}")
-        except Exception as e:
-            print(f"❌ Failed to fetch files: {e}")
-            pr_files = []
-        
-        # STEP 8: AI reviews the code
-        print("🤖 Starting AI code review...")
-        try:
-            review_feedback = review_service.review_pr_diff(pr_diff, pr_files)
-            print(f"✅ AI review completed: {review_feedback['overall_assessment']}")
-        except Exception as e:
-            print(f"❌ AI review failed: {e}")
-            raise HTTPException(status_code=500, detail=f"AI review failed: {e}")
-        
-        # STEP 9: Format feedback as GitHub comments
-        inline_comments = github_service.create_inline_comments(review_feedback)
-        print(f"💬 Created {len(inline_comments)} inline comments")
+        logger.info("🔍 Processing PR #%s - Action: %s", pr_data["pr_number"], action)
         
-        # STEP 10: Post review back to GitHub
-        try:
-            success = github_service.post_pr_review(
-                repo_owner=pr_data["repo_owner"],
-                repo_name=pr_data["repo_name"],
-                pr_number=pr_data["pr_number"],
-                comments=inline_comments,
-                review_body=review_feedback["summary"]
-            )
-            
-            if success:
-                print("✅ Review posted to GitHub successfully!")
-                return {
-                    "message": "✅ Code review completed and posted",
-                    "pr_number": pr_data["pr_number"],
-                    "assessment": review_feedback["overall_assessment"],
-                    "issues_found": len(review_feedback["issues"])
-                }
-            else:
-                raise HTTPException(status_code=500, detail="Failed to post review")
-                
-        except Exception as e:
-            print(f"❌ Failed to post review: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to post review: {e}")
+        # STEP 6-10: Review in the background so GitHub gets its ACK right away
+        background_tasks.add_task(_process_pr, pr_data)
+        response.status_code = 202
+        return {
+            "accepted": True,
+            "message": "⏳ Code review queued",
+            "pr_number": pr_data["pr_number"]
+        }
     
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
         # Catch any unexpected errors
-        print(f"❌ Unexpected error: {e}")
+        logger.exception("❌ Unexpected error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -266,6 +469,19 @@ async def github_webhook(
 # OPTIONAL: Manual PR review endpoint (for testing)
 # ============================================================================
 
+def _parse_pr_url(pr_url: str) -> Tuple[str, str, int]:
+    """Split https://github.com/owner/repo/pull/123 into (owner, repo, number)."""
+    pr = github_service.parse_pr_url(pr_url)
+    if pr is None:
+        raise HTTPException(status_code=400, detail="Invalid PR URL format")
+    return pr
+
+
+def _sse(event: str, data: Any) -> bytes:
+    """Encode one Server-Sent Event."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
 @app.post("/review/pr")
 async def manual_pr_review(pr_url: str):
     """
@@ -279,32 +495,26 @@ async def manual_pr_review(pr_url: str):
     
     # Parse PR URL to extract owner, repo, and PR number
     # Format: https://github.com/owner/repo/pull/123
-    try:
-        parts = pr_url.rstrip('/').split('/')
-        repo_owner = parts[-4]
-        repo_name = parts[-3]
-        pr_number = int(parts[-1])
-    except:
-        raise HTTPException(status_code=400, detail="Invalid PR URL format")
+    repo_owner, repo_name, pr_number = _parse_pr_url(pr_url)
     
-    print(f"🔍 Manual review triggered for PR #{pr_number}")
+    logger.info("🔍 Manual review triggered for PR #%s", pr_number)
     
     # Follow same flow as webhook (steps 6-10)
     try:
-        # Fetch diff
-        pr_diff = github_service.get_pr_diff(repo_owner, repo_name, pr_number)
-        
-        # Fetch files
-        pr_files = github_service.get_pr_files(repo_owner, repo_name, pr_number)
+        # Fetch diff and files concurrently
+        pr_diff, pr_files = await asyncio.gather(
+            github_service.get_pr_diff(repo_owner, repo_name, pr_number),
+            github_service.get_pr_files(repo_owner, repo_name, pr_number)
+        )
         
         # AI review
-        review_feedback = review_service.review_pr_diff(pr_diff, pr_files)
+        review_feedback = await review_service.review_pr_diff(pr_diff, pr_files)
         
         # Format comments
         inline_comments = github_service.create_inline_comments(review_feedback)
         
         # Post review
-        success = github_service.post_pr_review(
+        success = await github_service.post_pr_review(
             repo_owner, repo_name, pr_number,
             inline_comments, review_feedback["summary"]
         )
@@ -322,14 +532,85 @@ async def manual_pr_review(pr_url: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/review/pr/stream")
+async def manual_pr_review_stream(pr_url: str):
+    """
+    Manually trigger a PR review, streaming the results as Server-Sent Events.
+    
+    Example: POST /review/pr/stream?pr_url=https://github.com/owner/repo/pull/123
+    
+    LOGIC: Same as /review/pr, but issues are pushed as "issue" events
+    while the AI is still reviewing, followed by a "review" event with
+    the complete review and a "done" event once it's posted to GitHub.
+    """
+    repo_owner, repo_name, pr_number = _parse_pr_url(pr_url)
+    
+    logger.info("🔍 Streaming review triggered for PR #%s", pr_number)
+    
+    # Fetch before streaming starts, so failures are still plain HTTP errors
+    try:
+        pr_diff, pr_files = await asyncio.gather(
+            github_service.get_pr_diff(repo_owner, repo_name, pr_number),
+            github_service.get_pr_files(repo_owner, repo_name, pr_number)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def events():
+        review_feedback = None
+        async for event, data in review_service.stream_pr_review(pr_diff, pr_files):
+            if event == "review":
+                review_feedback = data
+            yield _sse(event, data)
+        
+        try:
+            success = await github_service.post_pr_review(
+                repo_owner, repo_name, pr_number,
+                github_service.create_inline_comments(review_feedback),
+                review_feedback["summary"]
+            )
+        except Exception as e:
+            logger.error("❌ Failed to post review: %s", e)
+            success = False
+        yield _sse("done", {"posted": success, "pr_url": pr_url})
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+# ============================================================================
+# IN-PROCESS UI (optional)
+# ============================================================================
+
+if settings.mount_ui:
+    # The mounted UI calls the services directly instead of this API
+    os.environ.setdefault("DIRECT_MODE", "true")
+    import gradio as gr
+    from frontend.app import ui
+    app = gr.mount_gradio_app(app, ui, path="/ui")
+
+
 # ============================================================================
 # APP STARTUP
 # ============================================================================
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "backend.app:app",
-        host=settings.backend_host,
-        port=settings.backend_port,
-        reload=True
-    )
\ No newline at end of file
+    if settings.env == "prod":
+        # Production: uvloop (when installed - not on Windows) + httptools,
+        # one worker per core, no reload/access log.
+        # A mounted Gradio UI keeps its state in the process, so it gets one worker.
+        uvicorn.run(
+            "backend.app:app",
+            host=settings.backend_host,
+            port=settings.backend_port,
+            loop="auto",
+            http="httptools",
+            workers=settings.worker_count,
+            access_log=False
+        )
+    else:
+        uvicorn.run(
+            "backend.app:app",
+            host=settings.backend_host,
+            port=settings.backend_port,
+            reload=True
+        )
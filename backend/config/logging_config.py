@@ -0,0 +1,26 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+def configure_logging(level: str = "INFO") -> QueueListener:
+    """
+    Route all backend.* loggers through a queue.
+    
+    LOGIC: Request handlers only put records on an in-memory queue;
+    a listener thread does the actual (blocking) stdout writes.
+    Call .stop() on the returned listener at shutdown to flush it.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    logger = logging.getLogger("backend")
+    logger.handlers[:] = [QueueHandler(log_queue)]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+    listener.start()
+    return listener
@@ -1,23 +1,62 @@
 import os
+from functools import lru_cache
 from typing import Optional
 from dotenv import load_dotenv
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # THIS LINE IS CRITICAL!
 load_dotenv()
 
-class Settings:
-    """Application settings and configuration."""
-
+class Settings(BaseSettings):
+    """
+    Application settings and configuration.
     
-    def __init__(self):
-        self.openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
-        self.backend_host: str = os.getenv("BACKEND_HOST", "127.0.0.1")
-        self.backend_port: int = int(os.getenv("BACKEND_PORT", "8000"))
-        self.frontend_host: str = os.getenv("FRONTEND_HOST", "0.0.0.0")
-        self.frontend_port: int = int(os.getenv("FRONTEND_PORT", "7819"))
-        self.model_name: str = os.getenv("MODEL_NAME", "gpt-4")
-        self.temperature: float = float(os.getenv("TEMPERATURE", "0.3"))
-        self.github_token: Optional[str] = os.getenv("GITHUB_TOKEN")
-        self.github_webhook_secret: Optional[str] = os.getenv("GITHUB_WEBHOOK_SECRET")
-
-settings = Settings()
+    Each field is read from the matching environment variable
+    (e.g. openai_api_key <- OPENAI_API_KEY) and type-checked once.
+    """
+
+    model_config = SettingsConfigDict(frozen=True, extra="ignore", protected_namespaces=())
+
+    openai_api_key: Optional[str] = None
+    backend_host: str = "127.0.0.1"
+    backend_port: int = 8000
+    env: str = "dev"
+    log_level: str = "INFO"
+    web_concurrency: int = Field(default_factory=lambda: (os.cpu_count() or 1) * 2 + 1)
+    frontend_host: str = "0.0.0.0"
+    frontend_port: int = 7819
+    mount_ui: bool = False  # Serve the Gradio UI from the backend at /ui
+    model_name: str = "gpt-4"
+    temperature: float = 0.3
+    github_token: Optional[str] = None
+    github_webhook_secret: Optional[str] = None
+    redis_url: Optional[str] = None
+    cache_ttl: int = 14400
+    batch_max_size: int = 16
+    batch_window_ms: int = 30
+    review_max_concurrency: int = 8
+    openai_max_concurrency: int = 16
+    max_requests_per_minute: int = 500
+    max_tokens_per_minute: int = 30000
+    probe_rate_limits: bool = True  # Read the account's real limits from OpenAI at startup
+    review_cache_enabled: bool = False
+    review_cache_path: str = ".review_cache"
+    review_cache_threshold: float = 0.95
+    review_cache_model: str = "all-MiniLM-L6-v2"
+
+    @property
+    def worker_count(self) -> int:
+        """Server processes: web_concurrency in prod, one in dev (reload) or with the UI mounted."""
+        if self.env != "prod" or self.mount_ui:
+            return 1
+        return self.web_concurrency
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Load settings once and share the instance (usable as a FastAPI dependency)."""
+    return Settings()
+
+
+settings = get_settings()
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict
+from typing import List, Literal, Optional
 
 class CodeGenerationRequest(BaseModel):
     query: str
@@ -22,9 +22,32 @@ class DocumentationRequest(BaseModel):
 class DocumentationResponse(BaseModel):
     documentation: str
 
+class TestsAndDocsRequest(BaseModel):
+    code: str
+    language: str
+
+class TestsAndDocsResponse(BaseModel):
+    tests: str
+    documentation: str
+
 class FileOperationRequest(BaseModel):
     code: str
     language: Optional[str] = None
 
 class FileOperationResponse(BaseModel):
     message: str
+
+class ReviewIssue(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    file: str
+    line: int
+    severity: Literal["critical", "major", "minor", "info"]
+    message: str
+
+class AIReviewResult(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    summary: str
+    issues: List[ReviewIssue]
+    overall_assessment: Literal["critical", "needs_work", "comment", "good"]
@@ -2,111 +2,209 @@
 import openai
 
 import os
-from backend.services.openai_client import client
+import re
+from typing import AsyncIterator, Dict, List
+from backend.services.openai_client import create_chat_completion
+from backend.services.batcher import completion_batcher
 from backend.config.settings import settings
 
 
+# Lines containing these phrases mark the start of trailing explanations
+EXPLANATORY_PHRASES = [
+    "Please note",
+    "Note that",
+    "This code",
+    "You should",
+    "For this code to work",
+    "Make sure",
+    "Remember",
+    "Important:",
+    "Also,",
+    "Additionally,"
+]
+_EXPLANATORY_RE = re.compile("|".join(re.escape(phrase) for phrase in EXPLANATORY_PHRASES))
+
+# Case-insensitive notes dropped from outside markdown code blocks
+_NOTE_RE = re.compile(
+    r"please note|note that|this code|you should|for this code|"
+    r"make sure|remember|important|also|additionally",
+    re.IGNORECASE
+)
+
+
+# System prompts are kept byte-for-byte identical across requests and all
+# per-request values go at the end of the user message, so OpenAI's automatic
+# prompt caching can reuse the shared prefix.
+_CODE_SYSTEM_PROMPT = """You return ONLY executable code. Never add explanations, notes, or markdown formatting.
+
+Generate ONLY the executable code in the requested language for the given task.
+
+CRITICAL RULES:
+- Return ONLY code that can be directly executed
+- NO explanations before or after the code
+- NO notes, warnings, or suggestions
+- NO markdown code blocks (```)
+- NO "Please note" or similar phrases
+- Just pure, clean, executable code"""
+
+_TESTS_SYSTEM_PROMPT = """You generate high-quality unit tests for developers.
+
+Given code in the requested language, generate unit tests using the best testing framework for that language.
+Ensure tests cover edge cases and include assertions."""
+
+_DOCS_SYSTEM_PROMPT = """You generate high-quality documentation for developers.
+
+Given code in the requested language, add detailed docstrings for all functions and classes. Ensure:
+- Parameters and return values are well-documented.
+- Docstrings follow standard conventions (e.g., Google style for Python)."""
+
+
+def _build_code_messages(query: str, language: str) -> List[Dict[str, str]]:
+    """Builds the chat messages for a code generation request."""
+    return [
+        {"role": "system", "content": _CODE_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Language: {language}\nTask: {query}"}
+    ]
 
 
-def generate_code(query, language):
-    prompt = f"""
-    Generate ONLY the executable {language} code for: {query}
-    
-    CRITICAL RULES:
-    - Return ONLY code that can be directly executed
-    - NO explanations before or after the code
-    - NO notes, warnings, or suggestions
-    - NO markdown code blocks (```)
-    - NO "Please note" or similar phrases
-    - Just pure, clean, executable code
+class _CodeCleaner:
+    """
+    Strips markdown fences, notes and trailing explanations from generated code.
+
+    LOGIC: Fed one line at a time, so the same cleanup works for a full
+    response (generate_code) and a stream (stream_code):
+    - markdown fences are dropped
+    - once the output has a code block, notes outside it are dropped
+    - output stops at the first explanatory line
+    Whether the output has a code block is only known when a fence shows
+    up, so lines before the first fence that a fence would drop are held
+    back until then (or until the end). Blank lines at the start and end
+    are dropped.
     """
 
-    response = client.chat.completions.create(
+    def __init__(self):
+        self.done = False
+        self._has_code_block = False
+        self._inside_code_block = False
+        self._held: List[str] = []
+        self._blank_lines: List[str] = []
+        self._started = False
+
+    def feed(self, line: str) -> str:
+        """Take one raw line; return the cleaned text that can be output now."""
+        if self.done:
+            return ""
+        if line.lstrip().startswith("```"):
+            text = ""
+            if not self._has_code_block:
+                # Now we know: held lines are notes outside a code block
+                self._has_code_block = True
+                text = self._release_held()
+            self._inside_code_block = not self._inside_code_block
+            return text
+        if not self._has_code_block and (self._held or _NOTE_RE.search(line)):
+            self._held.append(line)
+            return ""
+        return self._accept(line)
+
+    def finish(self) -> str:
+        """End of output: return whatever was still held back."""
+        return self._release_held()
+
+    def _release_held(self) -> str:
+        held, self._held = self._held, []
+        return "".join(self._accept(line) for line in held)
+
+    def _accept(self, line: str) -> str:
+        if self.done:
+            return ""
+        if self._has_code_block and not self._inside_code_block and _NOTE_RE.search(line):
+            return ""
+        if _EXPLANATORY_RE.search(line):
+            self.done = True
+            return ""
+        if not line.strip():
+            if self._started:
+                self._blank_lines.append(line)
+            return ""
+        text = "".join("\n" + blank for blank in self._blank_lines)
+        self._blank_lines = []
+        if self._started:
+            text += "\n" + line
+        else:
+            text += line.lstrip()
+            self._started = True
+        return text
+
+
+async def generate_code(query, language):
+    response = await completion_batcher.create(
         model=settings.model_name,
-        messages=[
-            {"role": "system", "content": "You return ONLY executable code. Never add explanations, notes, or markdown formatting."},
-            {"role": "user", "content": prompt}
-        ],
+        messages=_build_code_messages(query, language),
         temperature=settings.temperature
     )
     code = response.choices[0].message.content.strip()
 
-    # Remove markdown code blocks if present
-    if "```" in code:
-        # Find the actual code between markdown blocks
-        lines = code.split('\n')
-        code_lines = []
-        inside_code_block = False
-        
-        for line in lines:
-            if line.strip().startswith("```"):
-                inside_code_block = not inside_code_block
-                continue
-            if inside_code_block or not any(phrase in line.lower() for phrase in [
-                "please note", "note that", "this code", "you should", "for this code",
-                "make sure", "remember", "important", "also", "additionally"
-            ]):
-                code_lines.append(line)
-        
-        code = '\n'.join(code_lines).strip()
-    
-    # Remove common explanatory endings
-    explanatory_phrases = [
-        "Please note",
-        "Note that",
-        "This code",
-        "You should",
-        "For this code to work",
-        "Make sure",
-        "Remember",
-        "Important:",
-        "Also,",
-        "Additionally,"
-    ]
-    
-    lines = code.split('\n')
-    clean_lines = []
-    
-    for line in lines:
-        # Stop adding lines if we hit explanatory text
-        if any(phrase in line for phrase in explanatory_phrases):
-            break
-        clean_lines.append(line)
-    
-    return '\n'.join(clean_lines).strip()
+    # Single pass: strip markdown fences, drop notes outside code blocks
+    # and stop at the first explanatory line
+    cleaner = _CodeCleaner()
+    clean = "".join(cleaner.feed(line) for line in code.split('\n')) + cleaner.finish()
+    return clean.strip()
 
 
-def generate_unit_tests(code: str, language: str) -> str:
-    """Generates unit tests for the provided code."""
-    prompt = f"""
-    Given the following {language} code:
-    {code}
-    Generate unit tests using the best testing framework for {language}.
-    Ensure tests cover edge cases and include assertions.
+async def stream_code(query: str, language: str) -> AsyncIterator[str]:
+    """
+    Streams generated code line by line as tokens arrive.
+    
+    Applies the same cleanup as generate_code() (see _CodeCleaner) to
+    each complete line, so the streamed text matches its output.
     """
+    response = await create_chat_completion(
+        model=settings.model_name,
+        messages=_build_code_messages(query, language),
+        temperature=settings.temperature,
+        stream=True
+    )
+
+    buffer = ""
+    cleaner = _CodeCleaner()
+    try:
+        async for chunk in response:
+            if not chunk.choices:
+                continue
+            buffer += chunk.choices[0].delta.content or ""
+            *lines, buffer = buffer.split('\n')
+
+            text = "".join(cleaner.feed(line) for line in lines)
+            if text:
+                yield text
+            if cleaner.done:
+                return
 
-    response = client.chat.completions.create(
+        # Flush the final partial line and anything held back
+        text = cleaner.feed(buffer) + cleaner.finish()
+        if text:
+            yield text
+    finally:
+        await response.close()
+
+
+async def generate_unit_tests(code: str, language: str) -> str:
+    """Generates unit tests for the provided code."""
+    response = await create_chat_completion(
         model=settings.model_name,
-        messages=[{"role": "system", "content": "You generate high-quality unit tests for developers."},
-                  {"role": "user", "content": prompt}]
+        messages=[{"role": "system", "content": _TESTS_SYSTEM_PROMPT},
+                  {"role": "user", "content": f"Language: {language}\nCode:\n{code}"}]
     )
 
     return response.choices[0].message.content.strip()
 
-def generate_documentation(code: str, language: str) -> str:
+async def generate_documentation(code: str, language: str) -> str:
     """Generates documentation in the form of docstrings for classes and functions."""
-    prompt = f"""
-    Given the following {language} code:
-    {code}
-    Add detailed docstrings for all functions and classes. Ensure:
-    - Parameters and return values are well-documented.
-    - Docstrings follow standard conventions (e.g., Google style for Python).
-    """
-
-    response = client.chat.completions.create(
+    response = await create_chat_completion(
         model=settings.model_name,
-        messages=[{"role": "system", "content": "You generate high-quality documentation for developers."},
-                  {"role": "user", "content": prompt}]
+        messages=[{"role": "system", "content": _DOCS_SYSTEM_PROMPT},
+                  {"role": "user", "content": f"Language: {language}\nCode:\n{code}"}]
     )
 
     return response.choices[0].message.content.strip()
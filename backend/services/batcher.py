@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+from backend.services.openai_client import create_chat_completion
+from backend.config.settings import settings
+
+
+class CompletionBatcher:
+    """
+    Micro-batches chat completion requests.
+
+    LOGIC: Requests arriving within a short window are collected
+    and fired together with asyncio.gather, so bursts share the
+    pooled connections instead of trickling out one by one.
+    A lone request (nothing else queued or in flight) is sent
+    right away instead of waiting out the window.
+    """
+
+    def __init__(self, max_size: int, window_ms: int):
+        self.max_size = max_size
+        self.window = window_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def create(self, **kwargs: Any) -> Any:
+        """Queue a chat completion request and wait for its response."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((kwargs, future))
+        return await future
+
+    async def _run(self) -> None:
+        """Drain the queue into batches of up to max_size items or window seconds."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.empty() and not self._inflight:
+                self._start_dispatch(batch)
+                continue
+            deadline = loop.time() + self.window
+
+            while len(batch) < self.max_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self._start_dispatch(batch)
+
+    def _start_dispatch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        # Dispatch without waiting so the next window can start filling
+        task = asyncio.create_task(self._dispatch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def close(self) -> None:
+        """Stop the worker on shutdown, letting batches already sent finish."""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def _dispatch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        """Send every request in the batch concurrently and resolve their futures."""
+        results = await asyncio.gather(
+            *[create_chat_completion(**kwargs) for kwargs, _ in batch],
+            return_exceptions=True
+        )
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # Caller went away (e.g. request cancelled)
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+# Create singleton instance
+completion_batcher = CompletionBatcher(settings.batch_max_size, settings.batch_window_ms)
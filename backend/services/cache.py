@@ -0,0 +1,109 @@
+import hashlib
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple, Type
+from cachetools import TTLCache
+from backend.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(namespace: str, language: str, payload: str) -> str:
+    """Build a stable cache key from the endpoint, language and request payload."""
+    return hashlib.sha256(f"{namespace}\0{language}\0{payload}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache for generated AI responses.
+
+    LOGIC: Uses Redis when REDIS_URL is set (shared across workers),
+    otherwise falls back to an in-process TTL cache. Redis errors are
+    logged and treated as a miss / skipped write, so an unavailable
+    cache never fails a request.
+    """
+
+    def __init__(self):
+        self.ttl = settings.cache_ttl
+        self._redis = None
+        self._redis_error: Type[Exception] = Exception
+        self._local: Optional[TTLCache] = None
+
+        if settings.redis_url:
+            import redis.asyncio as redis
+            self._redis = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+            self._redis_error = redis.RedisError
+        else:
+            self._local = TTLCache(maxsize=1024, ttl=self.ttl)
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None on miss."""
+        if self._redis is not None:
+            try:
+                return await self._redis.get(key)
+            except self._redis_error as e:
+                logger.warning("⚠️  Redis cache read failed, treating as a miss: %s", e)
+                return None
+        return self._local.get(key)
+
+    async def set(self, key: str, value: str) -> None:
+        """Store value under key with the configured TTL."""
+        if self._redis is not None:
+            try:
+                await self._redis.setex(key, self.ttl, value)
+            except self._redis_error as e:
+                logger.warning("⚠️  Redis cache write failed, not caching: %s", e)
+        else:
+            self._local[key] = value
+
+    async def get_or_generate(
+        self,
+        namespace: str,
+        language: str,
+        payload: str,
+        generate: Callable[[], Awaitable[str]]
+    ) -> Tuple[str, bool]:
+        """
+        Return (value, hit) - the cached value if present, otherwise
+        the result of generate() which is then stored.
+        """
+        key = make_cache_key(namespace, language, payload)
+        cached = await self.get(key)
+        if cached is not None:
+            return cached, True
+
+        value = await generate()
+        await self.set(key, value)
+        return value, False
+
+    async def get_or_stream(
+        self,
+        namespace: str,
+        language: str,
+        payload: str,
+        stream: Callable[[], AsyncIterator[str]]
+    ) -> Tuple[AsyncIterator[str], bool]:
+        """
+        Return (chunks, hit) - the cached value as a single chunk if present,
+        otherwise stream()'s chunks. A stream that runs to completion is
+        stored, so it is shared with get_or_generate() for the same key.
+        """
+        key = make_cache_key(namespace, language, payload)
+        cached = await self.get(key)
+        if cached is not None:
+            return self._replay(cached), True
+        return self._stream_and_store(key, stream()), False
+
+    async def _replay(self, value: str) -> AsyncIterator[str]:
+        yield value
+
+    async def _stream_and_store(self, key: str, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        parts = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        # Only reached when the stream completed (not on client disconnect)
+        await self.set(key, "".join(parts))
+
+
+# Create singleton instance
+response_cache = ResponseCache()
@@ -1,17 +1,23 @@
+import asyncio
+import aiofiles
 import pyperclip
 import os
+from typing import Dict
 
-def copy_to_clipboard(code: str) -> str:
+# File extension for each supported language
+_EXT: Dict[str, str] = {"python": "py", "javascript": "js", "html": "html", "java": "java", "c++": "cpp", "go": "go"}
+
+async def copy_to_clipboard(code: str) -> str:
     """Copies the generated code to the clipboard."""
-    pyperclip.copy(code)
+    # pyperclip shells out to the OS clipboard tool, so keep it off the event loop
+    await asyncio.to_thread(pyperclip.copy, code)
     return "✅ Code copied to clipboard!"
 
-def save_to_file(code: str, language: str) -> str:
+async def save_to_file(code: str, language: str) -> str:
     """Saves the generated code to a file with the correct extension."""
-    extensions = {"python": "py", "javascript": "js", "html": "html", "java": "java", "c++": "cpp", "go": "go"}
-    file_name = f"generated_code.{extensions.get(language, 'txt')}"
+    file_name = f"generated_code.{_EXT.get(language.lower(), 'txt')}"
 
-    with open(file_name, "w") as file:
-        file.write(code)
+    async with aiofiles.open(file_name, "w") as file:
+        await file.write(code)
 
     return f"✅ Code saved as {file_name}"
@@ -1,9 +1,18 @@
+import asyncio
 import hmac
+import logging
 import hashlib
-import requests
-from typing import Dict, Any, List, Optional
+import re
+import httpx
+from cachetools import TTLCache
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
 from backend.config.settings import settings
 
+logger = logging.getLogger(__name__)
+
+# https://github.com/owner/repo/pull/123 (optionally followed by /files, ?query, #anchor)
+_PR_URL_RE = re.compile(r"^https?://(?:www\.)?github\.com/([^/]+)/([^/]+)/pull/(\d+)(?:[/?#].*)?$")
+
 
 class GitHubService:
     """Service for interacting with GitHub API and webhooks."""
@@ -12,6 +21,18 @@ class GitHubService:
         self.github_token = settings.github_token
         self.webhook_secret = settings.github_webhook_secret
         self.base_url = "https://api.github.com"
+        
+        # Shared async client - keeps HTTP/2 connections to GitHub alive between calls
+        self._client = httpx.AsyncClient(
+            http2=True,
+            headers={"Authorization": f"token {self.github_token}"},
+            timeout=30,
+            limits=httpx.Limits(max_keepalive_connections=50)
+        )
+        
+        # Diff/files fetches keyed by (kind, owner, repo, pr_number, head_sha).
+        # Holds the in-flight task so racing synchronize events share one request.
+        self._pr_cache: TTLCache = TTLCache(maxsize=1024, ttl=600)
     
     
     def verify_webhook_signature(self, payload_body: bytes, signature_header: str) -> bool:
@@ -23,20 +44,23 @@ class GitHubService:
         if not signature_header:
             raise ValueError("❌ Missing signature header")
         
-        try:
-            algorithm, github_signature = signature_header.split("=")
-        except ValueError:
-            raise ValueError("❌ Invalid signature format")
-        
-        # Create expected signature
+        # Create expected signature first so every path does the same work
         expected_signature = hmac.new(
             self.webhook_secret.encode('utf-8'),
             payload_body,
             hashlib.sha256
-        ).hexdigest()
+        ).digest()
         
-        # Secure comparison
-        if not hmac.compare_digest(github_signature, expected_signature):
+        try:
+            algorithm, github_signature = signature_header.split("=", 1)
+            received_signature = bytes.fromhex(github_signature)
+        except ValueError:
+            # Still run a constant-time compare so failure latency matches success
+            hmac.compare_digest(bytes(len(expected_signature)), expected_signature)
+            raise ValueError("❌ Invalid signature format")
+        
+        # Secure comparison on raw digest bytes
+        if not hmac.compare_digest(received_signature, expected_signature) or algorithm != "sha256":
             raise ValueError("❌ Signature verification failed!")
         
         return True
@@ -47,7 +71,7 @@ class GitHubService:
         Extract PR information from webhook payload.
         
         LOGIC: Like parsing JSON from an API response in mobile dev.
-        Extract: repo owner, repo name, PR number, action type
+        Extract: repo owner, repo name, PR number, action type, head commit SHA
         """
         try:
             pr_data = {
@@ -56,27 +80,74 @@ class GitHubService:
                 "repo_owner": payload["repository"]["owner"]["login"],
                 "repo_name": payload["repository"]["name"],
                 "pr_url": payload["pull_request"]["html_url"],
+                "head_sha": payload["pull_request"].get("head", {}).get("sha"),
             }
             return pr_data
         except KeyError as e:
-            print(f"❌ Failed to parse webhook payload: {e}")
+            logger.error("❌ Failed to parse webhook payload: %s", e)
+            return None
+    
+    
+    def parse_pr_url(self, pr_url: str) -> Optional[Tuple[str, str, int]]:
+        """
+        Extract (repo owner, repo name, PR number) from a PR URL.
+        
+        Format: https://github.com/owner/repo/pull/123
+        Returns None if the URL isn't a GitHub PR URL.
+        """
+        match = _PR_URL_RE.match(pr_url.strip())
+        if not match:
             return None
+        return match.group(1), match.group(2), int(match.group(3))
+    
+    
+    async def _cached_fetch(self, key: Tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fetch() once per key while it's cached.
+        
+        LOGIC: head_sha changes on every push, so a cached entry can never be
+        stale for its key - the TTL only bounds memory. Without a head_sha
+        there's nothing safe to key on, so we always fetch.
+        """
+        if key[-1] is None:
+            return await fetch()
+        
+        task = self._pr_cache.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._pr_cache[key] = task
+        
+        try:
+            # Shield so one cancelled caller doesn't cancel the shared fetch
+            return await asyncio.shield(task)
+        except Exception:
+            self._pr_cache.pop(key, None)
+            raise
     
     
-    def get_pr_diff(self, repo_owner: str, repo_name: str, pr_number: int) -> str:
+    async def get_pr_diff(
+        self, repo_owner: str, repo_name: str, pr_number: int, head_sha: Optional[str] = None
+    ) -> str:
         """
         Fetch the code diff from GitHub for a PR.
         
         LOGIC: Make API call to GitHub to get "what changed in this PR"
         Similar to: Fetching data from REST API in mobile app
         """
+        return await self._cached_fetch(
+            ("diff", repo_owner, repo_name, pr_number, head_sha),
+            lambda: self._fetch_pr_diff(repo_owner, repo_name, pr_number)
+        )
+    
+    
+    async def _fetch_pr_diff(self, repo_owner: str, repo_name: str, pr_number: int) -> str:
+        """Fetch the PR diff from the GitHub API (uncached)."""
         url = f"{self.base_url}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}"
         headers = {
-            "Authorization": f"token {self.github_token}",
             "Accept": "application/vnd.github.v3.diff"  # Request diff format
         }
         
-        response = requests.get(url, headers=headers)
+        response = await self._client.get(url, headers=headers)
         
         if response.status_code == 200:
             return response.text  # The actual diff content
@@ -84,20 +155,29 @@ class GitHubService:
             raise Exception(f"❌ Failed to fetch PR diff: {response.status_code}")
     
     
-    def get_pr_files(self, repo_owner: str, repo_name: str, pr_number: int) -> List[Dict[str, Any]]:
+    async def get_pr_files(
+        self, repo_owner: str, repo_name: str, pr_number: int, head_sha: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """
         Get list of files changed in the PR.
         
         LOGIC: Get metadata about what files were modified
         Returns: List of file objects with filename, status, changes, etc.
         """
+        return await self._cached_fetch(
+            ("files", repo_owner, repo_name, pr_number, head_sha),
+            lambda: self._fetch_pr_files(repo_owner, repo_name, pr_number)
+        )
+    
+    
+    async def _fetch_pr_files(self, repo_owner: str, repo_name: str, pr_number: int) -> List[Dict[str, Any]]:
+        """Fetch the PR files list from the GitHub API (uncached)."""
         url = f"{self.base_url}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}/files"
         headers = {
-            "Authorization": f"token {self.github_token}",
             "Accept": "application/vnd.github.v3+json"
         }
         
-        response = requests.get(url, headers=headers)
+        response = await self._client.get(url, headers=headers)
         
         if response.status_code == 200:
             return response.json()  # List of file objects
@@ -135,7 +215,7 @@ class GitHubService:
         return comments
     
     
-    def post_pr_review(
+    async def post_pr_review(
         self, 
         repo_owner: str, 
         repo_name: str, 
@@ -151,7 +231,6 @@ class GitHubService:
         """
         url = f"{self.base_url}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}/reviews"
         headers = {
-            "Authorization": f"token {self.github_token}",
             "Accept": "application/vnd.github.v3+json"
         }
         
@@ -162,14 +241,19 @@ class GitHubService:
             "comments": comments
         }
         
-        response = requests.post(url, json=review_data, headers=headers)
+        response = await self._client.post(url, json=review_data, headers=headers)
         
         if response.status_code == 200:
-            print("✅ Review posted successfully!")
+            logger.info("✅ Review posted successfully!")
             return True
         else:
-            print(f"❌ Failed to post review: {response.status_code} - {response.text}")
+            logger.error("❌ Failed to post review: %s - %s", response.status_code, response.text)
             return False
+    
+    
+    async def close(self) -> None:
+        """Close the shared HTTP client (on app shutdown)."""
+        await self._client.aclose()
 
 
 # Create singleton instance
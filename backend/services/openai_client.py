@@ -1,5 +1,158 @@
+import asyncio
+import logging
+from typing import Any, Optional
 import openai
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from backend.services.rate_limiter import openai_rate_limiter, per_worker
+from backend.services.tokenizer import count_message_tokens
 from backend.config.settings import settings
 
-# OpenAI API Key - Replace with your own API key
-client = openai.OpenAI(api_key=settings.openai_api_key)
+logger = logging.getLogger(__name__)
+
+# Single async client shared by code generation and reviews.
+# The aiohttp transport lets many concurrent requests share one pooled
+# session instead of queueing on httpx's connection pool.
+# Retries are handled by create_chat_completion() below, not the SDK.
+async_client = openai.AsyncOpenAI(
+    api_key=settings.openai_api_key,
+    http_client=openai.DefaultAioHttpClient(),
+    max_retries=0
+)
+
+# Caps in-flight OpenAI requests so bursts don't trip the account's RPM/TPM limits
+_semaphore = asyncio.Semaphore(settings.openai_max_concurrency)
+
+# Completion size reserved with the rate limiter when max_tokens isn't set
+_EST_OUTPUT_TOKENS = 1000
+
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential_jitter(),
+    retry=retry_if_exception_type((
+        openai.RateLimitError,
+        openai.InternalServerError,
+        openai.APIConnectionError,
+    )),
+    reraise=True
+)
+async def _create_with_retry(estimated_tokens: int, **kwargs: Any) -> Any:
+    # Every attempt is a real request, so each one waits for rate limit budget
+    await openai_rate_limiter.acquire(estimated_tokens)
+    return await async_client.chat.completions.create(**kwargs)
+
+
+class _HeldStream:
+    """
+    A streamed completion that keeps its concurrency slot until it's done.
+    
+    LOGIC: create(stream=True) returns as soon as the response starts, but
+    the request is in flight until the stream is consumed - so the slot
+    is released when iteration ends or close() is called, whichever is
+    first. Everything else is delegated to the SDK's stream.
+    """
+
+    def __init__(self, stream: Any):
+        self._stream = stream
+        self._released = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        finally:
+            self._release()
+
+    async def __aenter__(self) -> "_HeldStream":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        try:
+            await self._stream.close()
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            _semaphore.release()
+
+
+async def create_chat_completion(**kwargs: Any) -> Any:
+    """
+    Create a chat completion with bounded concurrency, shaped by the rate limiter.
+    
+    Each request first takes its prompt tokens (counted with tiktoken) plus
+    the expected completion size from the RPM/TPM token bucket, so we stay
+    under the account's limits instead of backing off after 429s.
+    Rate limit (429), server (5xx) and connection errors are still retried
+    with exponential backoff and jitter, up to 5 attempts.
+    
+    With stream=True the concurrency slot is held until the returned stream
+    is consumed or closed, so callers must close it (e.g. in a finally).
+    """
+    estimated_tokens = (
+        count_message_tokens(kwargs["messages"], kwargs["model"])
+        + (kwargs.get("max_tokens") or _EST_OUTPUT_TOKENS)
+    )
+    if not kwargs.get("stream"):
+        async with _semaphore:
+            return await _create_with_retry(estimated_tokens, **kwargs)
+    
+    await _semaphore.acquire()
+    try:
+        return _HeldStream(await _create_with_retry(estimated_tokens, **kwargs))
+    except BaseException:
+        _semaphore.release()
+        raise
+
+
+def _header_int(headers: Any, name: str) -> Optional[int]:
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+async def probe_rate_limits() -> None:
+    """
+    Size the rate limiter from the account's actual limits.
+    
+    LOGIC: Send a 1-token request and read the x-ratelimit-limit-* response
+    headers. MAX_REQUESTS_PER_MINUTE / MAX_TOKENS_PER_MINUTE, when set
+    explicitly, still cap the result. Each worker process takes its
+    share (see rate_limiter.per_worker). Failures only log a warning.
+    """
+    try:
+        raw = await async_client.chat.completions.with_raw_response.create(
+            model=settings.model_name,
+            messages=[{"role": "user", "content": "ping"}],
+            max_tokens=1
+        )
+    except openai.OpenAIError as e:
+        logger.warning("⚠️  Rate limit probe failed, keeping configured limits: %s", e)
+        return
+    
+    requests_per_minute = _header_int(raw.headers, "x-ratelimit-limit-requests")
+    tokens_per_minute = _header_int(raw.headers, "x-ratelimit-limit-tokens")
+    if not requests_per_minute or not tokens_per_minute:
+        logger.warning("⚠️  No rate limit headers from OpenAI, keeping configured limits")
+        return
+    
+    if "max_requests_per_minute" in settings.model_fields_set:
+        requests_per_minute = min(requests_per_minute, settings.max_requests_per_minute)
+    if "max_tokens_per_minute" in settings.model_fields_set:
+        tokens_per_minute = min(tokens_per_minute, settings.max_tokens_per_minute)
+    
+    openai_rate_limiter.configure(per_worker(requests_per_minute), per_worker(tokens_per_minute))
+    logger.info(
+        "🚦 OpenAI rate limits: %d requests/min, %d tokens/min (this worker: %d, %d)",
+        requests_per_minute, tokens_per_minute,
+        openai_rate_limiter.requests_per_minute, openai_rate_limiter.tokens_per_minute
+    )
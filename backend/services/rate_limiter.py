@@ -0,0 +1,73 @@
+import asyncio
+import time
+from backend.config.settings import settings
+
+
+class TokenBucket:
+    """
+    Client-side limiter for OpenAI requests-per-minute and tokens-per-minute.
+    
+    LOGIC: Two buckets refill continuously at rpm/60 and tpm/60 per second.
+    Each call takes one request plus its estimated tokens, waiting until
+    both are available - so we slow down before OpenAI starts returning 429s.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def configure(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        """Change the limits (e.g. to the account's actual ones), keeping what's already been used."""
+        self._refill()
+        self._requests = min(self._requests, requests_per_minute)
+        self._tokens = min(self._tokens, tokens_per_minute)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until one request and `tokens` tokens fit under the limits."""
+        # A request bigger than the whole per-minute budget waits for a full bucket
+        tokens = min(tokens, self.tokens_per_minute)
+
+        # The lock makes waiters queue up in order instead of racing for capacity
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+
+                wait = max(
+                    (1 - self._requests) * 60 / self.requests_per_minute,
+                    (tokens - self._tokens) * 60 / self.tokens_per_minute
+                )
+                await asyncio.sleep(wait)
+
+
+def per_worker(limit: int) -> int:
+    """
+    This process's share of an account-wide per-minute limit.
+    
+    LOGIC: Every worker process has its own bucket, so each gets an equal
+    slice of the limit and together they stay under it.
+    """
+    return max(1, limit // settings.worker_count)
+
+
+# Create singleton instance
+openai_rate_limiter = TokenBucket(
+    per_worker(settings.max_requests_per_minute),
+    per_worker(settings.max_tokens_per_minute)
+)
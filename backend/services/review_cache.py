@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+from cachetools import TTLCache
+from backend.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Diff text is embedded in windows of this many characters and mean-pooled,
+# so changes anywhere in the diff (not just the first few hundred tokens) count
+_WINDOW_CHARS = 1000
+# Oldest entries are dropped beyond this many cached reviews
+_MAX_ENTRIES = 5000
+# New reviews are written to disk together, at most once per this many seconds
+_FLUSH_DELAY_SECONDS = 30
+
+
+class ExactReviewCache:
+    """
+    Exact-match cache of PR reviews.
+    
+    LOGIC: The same commit reviewed twice (webhook redelivery, manual
+    re-run) produces the same diff - a sha256 of the review inputs is
+    enough to skip the OpenAI call entirely.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: int = 3600):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, diff: str, files: List[Dict[str, Any]], model: str, temperature: float) -> str:
+        """Hash a canonical JSON of everything that affects the review."""
+        canonical = json.dumps(
+            {
+                "diff": diff,
+                "files": sorted(f["filename"] for f in files),
+                "model": model,
+                "temperature": temperature,
+            },
+            sort_keys=True
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        review = self._cache.get(key)
+        if review is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return review
+
+    def set(self, key: str, review: Dict[str, Any]) -> None:
+        self._cache[key] = review
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for observability."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "size": len(self._cache),
+        }
+
+
+class SemanticReviewCache:
+    """
+    Cache of past PR reviews looked up by diff similarity.
+    
+    LOGIC: Re-pushes, rebases and CI retries send (nearly) the same diff again.
+    We embed each reviewed diff with a local sentence-transformers model and
+    keep the normalized vectors in one numpy matrix, so a lookup is a single
+    matrix-vector product. A hit needs cosine similarity >= threshold AND the
+    exact same set of changed files.
+    
+    Optional: needs `sentence-transformers` and `numpy`. Enabled with
+    REVIEW_CACHE_ENABLED=true; persisted to REVIEW_CACHE_PATH.npz.
+    Stores only update memory; the file is rewritten in the background
+    (batching stores within _FLUSH_DELAY_SECONDS) and on close(), via a
+    temp file and os.replace - embeddings and entries live in that one
+    file, so they are always replaced together. Single worker only:
+    every worker would keep its own copy and overwrite the others'.
+    """
+
+    def __init__(self, path: str, threshold: float, model_name: str):
+        self.path = path
+        self.threshold = threshold
+        self.model_name = model_name
+        self._model = None
+        self._embeddings = None
+        self._entries: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_now = asyncio.Event()
+
+    def _load(self) -> None:
+        """Load the model and any persisted cache (runs once, off the event loop)."""
+        import numpy as np
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(self.model_name)
+        dim = self._model.get_sentence_embedding_dimension()
+        self._embeddings = np.empty((0, dim), dtype=np.float32)
+
+        if os.path.exists(f"{self.path}.npz"):
+            with np.load(f"{self.path}.npz") as data:
+                self._embeddings = data["embeddings"]
+                self._entries = json.loads(str(data["entries"]))
+            logger.info("📦 Loaded %d cached reviews", len(self._entries))
+
+    def _embed(self, diff: str, filenames: List[str]):
+        import numpy as np
+
+        text = "\n".join(filenames) + "\n" + diff
+        windows = [text[i:i + _WINDOW_CHARS] for i in range(0, len(text), _WINDOW_CHARS)] or [text]
+        vectors = self._model.encode(windows, normalize_embeddings=True)
+        vector = vectors.mean(axis=0)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def _lookup(self, diff: str, filenames: List[str]) -> Optional[Dict[str, Any]]:
+        if self._model is None:
+            self._load()
+        if not self._entries:
+            return None
+
+        scores = self._embeddings @ self._embed(diff, filenames)
+        best = int(scores.argmax())
+        entry = self._entries[best]
+        if scores[best] >= self.threshold and entry["files"] == filenames:
+            logger.info("🎯 Review cache hit (similarity %.3f)", scores[best])
+            return entry["review"]
+        return None
+
+    def _store(self, diff: str, filenames: List[str], review: Dict[str, Any]) -> None:
+        import numpy as np
+
+        if self._model is None:
+            self._load()
+
+        self._embeddings = np.vstack([self._embeddings, self._embed(diff, filenames)])[-_MAX_ENTRIES:]
+        self._entries = (self._entries + [{"files": filenames, "review": review}])[-_MAX_ENTRIES:]
+        self._dirty = True
+
+    def _write(self, embeddings, entries: List[Dict[str, Any]]) -> None:
+        """Write a snapshot of the cache to one file, replaced atomically."""
+        import numpy as np
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, embeddings=embeddings, entries=np.array(json.dumps(entries)))
+        os.replace(tmp_path, f"{self.path}.npz")
+
+    async def lookup(self, diff: str, files: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Return a cached review for a near-identical diff, or None."""
+        filenames = sorted(f["filename"] for f in files)
+        try:
+            async with self._lock:
+                return await asyncio.to_thread(self._lookup, diff, filenames)
+        except Exception as e:
+            logger.error("❌ Review cache lookup failed: %s", e)
+            return None
+
+    async def store(self, diff: str, files: List[Dict[str, Any]], review: Dict[str, Any]) -> None:
+        """Remember a finished review for this diff."""
+        filenames = sorted(f["filename"] for f in files)
+        try:
+            async with self._lock:
+                await asyncio.to_thread(self._store, diff, filenames, review)
+        except Exception as e:
+            logger.error("❌ Review cache store failed: %s", e)
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.wait_for(self._flush_now.wait(), _FLUSH_DELAY_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write the cache to disk if it changed since the last write."""
+        async with self._write_lock:
+            async with self._lock:
+                if not self._dirty:
+                    return
+                # Stores replace these rather than mutate them, so the snapshot stays valid
+                embeddings, entries = self._embeddings, self._entries
+                self._dirty = False
+            try:
+                await asyncio.to_thread(self._write, embeddings, entries)
+            except Exception as e:
+                logger.error("❌ Review cache write failed: %s", e)
+                self._dirty = True  # Try again with the next write
+
+    async def close(self) -> None:
+        """Write pending reviews now, e.g. on shutdown."""
+        self._flush_now.set()
+        if self._flush_task is not None:
+            await self._flush_task
+        await self.flush()
+
+
+# Create singleton instances (semantic cache is None when disabled)
+exact_review_cache = ExactReviewCache()
+
+review_cache: Optional[SemanticReviewCache] = None
+if settings.review_cache_enabled and settings.worker_count > 1:
+    logger.warning("⚠️  Semantic review cache needs a single worker, disabled with %d workers", settings.worker_count)
+elif settings.review_cache_enabled:
+    review_cache = SemanticReviewCache(
+        settings.review_cache_path,
+        settings.review_cache_threshold,
+        settings.review_cache_model
+    )
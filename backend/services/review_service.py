@@ -1,7 +1,248 @@
-from typing import Dict, Any, List
-from backend.services.openai_client import client
+import asyncio
+import functools
+import logging
+import re
+import openai
+import orjson
+from pydantic import ValidationError
+from typing import Dict, Any, AsyncIterator, Callable, Iterable, List, Optional, Set, Tuple
+from backend.services.openai_client import create_chat_completion
+from backend.services.tokenizer import get_encoder
+from backend.services.review_cache import review_cache, exact_review_cache
+from backend.models.schemas import AIReviewResult, ReviewIssue
 from backend.config.settings import settings
 
+try:
+    import ahocorasick
+except ImportError:  # Optional - falls back to plain substring scans
+    ahocorasick = None
+
+try:
+    import ijson
+except ImportError:  # Optional - streamed issues then arrive once per reviewed chunk
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+
+# Start of each file section in a unified git diff
+_DIFF_FILE_RE = re.compile(r"^(?=diff --git )", re.MULTILINE)
+_DIFF_HEADER_RE = re.compile(r"^diff --git a/.+? b/(.+)$", re.MULTILINE)
+# Start of each hunk within a file section
+_DIFF_HUNK_RE = re.compile(r"^(?=@@ )", re.MULTILINE)
+
+# Max diff tokens sent in a single review request (instructions and the
+# answer still fit in gpt-4's 8K context)
+_MAX_CHUNK_TOKENS = 3000
+
+# Severity keywords for a single issue line
+_CRITICAL_WORDS = frozenset(['critical', 'security', 'vulnerable', 'exploit'])
+_MAJOR_WORDS = frozenset(['major', 'bug', 'error', 'broken'])
+_MINOR_WORDS = frozenset(['minor', 'style', 'formatting', 'suggestion'])
+
+# Keywords for the overall PR assessment
+_ASSESSMENT_CRITICAL_WORDS = frozenset(['critical', 'security', 'vulnerable', 'broken'])
+_ASSESSMENT_MAJOR_WORDS = frozenset(['major', 'bug', 'error'])
+_ASSESSMENT_GOOD_WORDS = frozenset(['looks good', 'lgtm'])
+
+# Overall assessments, most severe first
+_ASSESSMENT_CRITICAL = "❌ Changes need attention - critical issues found"
+_ASSESSMENT_NEEDS_WORK = "⚠️ Good start, but some issues need fixing"
+_ASSESSMENT_COMMENT = "💬 Review completed - see comments for details"
+_ASSESSMENT_GOOD = "✅ Changes look good!"
+_ASSESSMENT_ORDER = [_ASSESSMENT_CRITICAL, _ASSESSMENT_NEEDS_WORK, _ASSESSMENT_COMMENT, _ASSESSMENT_GOOD]
+
+# overall_assessment values in the structured (JSON) review
+_JSON_ASSESSMENTS = {
+    "critical": _ASSESSMENT_CRITICAL,
+    "needs_work": _ASSESSMENT_NEEDS_WORK,
+    "comment": _ASSESSMENT_COMMENT,
+    "good": _ASSESSMENT_GOOD,
+}
+
+# Reviewer instructions, identical for every request. Kept above 1024 tokens
+# so OpenAI's automatic prompt caching serves it as a cached prefix; all
+# per-PR content goes in the user message after it.
+_REVIEW_SYSTEM_PROMPT = """You are an expert code reviewer. Analyze code changes and identify:
+1. Bugs and logic errors
+2. Security vulnerabilities
+3. Performance issues
+4. Best practice violations
+5. Code style issues
+
+Provide specific, actionable feedback with line numbers when possible.
+Be constructive and helpful in your tone.
+
+## Reviewer guidelines
+
+### Scope
+- Review only the lines added or changed in the diff. Lines starting with "+" are new, lines starting with "-" were removed, and unprefixed lines are unchanged context.
+- Use the context lines to understand the change, but do not report problems that exist only in unchanged code unless the change makes them worse or depends on them.
+- A large pull request may be split into several parts, one file (or part of a file) at a time. Review the part you are given on its own terms and do not speculate about files you cannot see.
+- If a change looks intentional and reasonable, do not invent problems. An empty list of issues is a valid review.
+
+### What to look for
+Correctness:
+- Off-by-one errors, wrong comparison operators, inverted conditions and unreachable branches.
+- Missing handling of None/null, empty collections, zero, negative numbers and very large inputs.
+- Exceptions that are swallowed, too broad, or leave state half-updated.
+- Resource leaks: files, sockets, database connections and locks that are not closed or released on every path.
+- Concurrency problems: shared mutable state, race conditions, missing awaits, blocking calls inside async code.
+- Changes to public functions or APIs that break existing callers.
+
+Security:
+- Injection of any kind: SQL, shell commands, template rendering, path traversal, and unsafe deserialization.
+- Cross-site scripting from unescaped user input in HTML, and missing CSRF protection on state-changing endpoints.
+- Secrets, tokens or passwords committed in code, logged, or returned in error messages.
+- Missing authentication or authorization checks, and trusting client-supplied identifiers.
+- Weak cryptography, home-grown crypto, non-constant-time comparison of secrets, and insecure randomness for security purposes.
+- Overly permissive CORS, file permissions or network exposure.
+
+Performance:
+- Work repeated inside loops that could be done once, and nested loops over large inputs.
+- N+1 queries and network calls made one at a time where they could be batched or run concurrently.
+- Loading whole files or result sets into memory when streaming would do.
+- Missing indexes, missing pagination, and unbounded caches or queues.
+- Only report performance issues that plausibly matter at the scale the code runs at.
+
+Maintainability and best practices:
+- Unclear names, functions doing too many things, and duplicated logic that should be shared.
+- Magic numbers and strings that deserve a named constant.
+- Missing or misleading comments and docstrings on non-obvious code.
+- Missing tests for new behavior or for a bug being fixed.
+- Dead code, leftover debugging output and commented-out code.
+
+Style:
+- Inconsistency with the conventions already used in the surrounding code.
+- Formatting problems only when they hurt readability; do not nitpick what an auto-formatter would fix.
+
+### Tests
+- Check that new or changed tests actually exercise the changed behavior, including edge cases and failure paths.
+- Flag tests that depend on timing, network access, test ordering or shared global state.
+- Flag assertions that can never fail, and mocks that hide the behavior under test.
+
+### Dependencies and configuration
+- New dependencies should be necessary, maintained, and pinned consistently with the rest of the project.
+- New configuration and environment variables should have sensible defaults, and required settings should fail loudly when missing.
+- Database migrations should be safe to run on existing data and, where possible, reversible.
+- Logging should carry useful context at the right level, never include sensitive data, and stay out of hot paths.
+
+### Severity levels
+- Critical: security vulnerabilities, data loss or corruption, crashes on common paths, or anything that must block merging.
+- Major: bugs that produce wrong results in realistic cases, missing error handling likely to fail in production, or significant performance regressions.
+- Minor: maintainability, readability and style problems, small inefficiencies, and suggestions that would improve the code but are safe to merge without.
+- Info: observations, questions, and praise for good changes.
+Use the lowest severity that honestly describes the impact. Do not label style preferences as Major or Critical.
+
+### How to write each issue
+- Always name the file the issue is in, exactly as it appears in the diff, and the line number in the new version of the file when you can tell it.
+- Describe one problem per issue. Say what is wrong, why it matters, and how to fix it, ideally with a short code suggestion.
+- Be concise: one to three sentences per issue is usually enough.
+- Be respectful and assume good intent. Critique the code, not the author.
+- Do not repeat the same issue for every occurrence; mention it once and note that it recurs.
+
+### Summary
+- Start with a short summary of what the change does and your overall impression.
+- If the change looks good, say so plainly, for example "Looks good" or "LGTM".
+- If there are critical or major issues, say clearly that they need attention before merging.
+
+### Feedback format
+Please provide your feedback in a clear, structured format with:
+- Specific line numbers or file names when possible
+- Severity level (Critical/Major/Minor)
+- Actionable suggestions for improvement"""
+
+# Per-request user message; only the volatile, per-PR content
+_PROMPT_TMPL = """Please review the following code changes from a Pull Request.
+
+**Files Changed:**
+{files}
+
+**Code Diff:**
+```
+{diff}
+```
+"""
+
+_ALL_KEYWORDS = (
+    _CRITICAL_WORDS | _MAJOR_WORDS | _MINOR_WORDS
+    | _ASSESSMENT_CRITICAL_WORDS | _ASSESSMENT_MAJOR_WORDS | _ASSESSMENT_GOOD_WORDS
+)
+
+
+def _build_automaton(words: Iterable[str]):
+    """Compile words into one Aho-Corasick automaton (None if unavailable or empty)."""
+    words = list(words)
+    if ahocorasick is None or not words:
+        return None
+    automaton = ahocorasick.Automaton()
+    for word in words:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+
+# Heavy shared state is built lazily, once per process, on first use -
+# not at import, so reloads and forked workers don't pay for it up front
+
+@functools.cache
+def _get_severity_automaton():
+    """Aho-Corasick automaton over every severity/assessment keyword."""
+    return _build_automaton(_ALL_KEYWORDS)
+
+
+def _get_encoder():
+    """Tokenizer for the review model (loaded off the event loop, see tokenizer.get_encoder)."""
+    return get_encoder(settings.model_name)
+
+
+@functools.cache
+def _get_review_response_format() -> Dict[str, Any]:
+    """Ask the model for a review matching AIReviewResult (OpenAI structured outputs)."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "code_review",
+            "strict": True,
+            "schema": AIReviewResult.model_json_schema(),
+        },
+    }
+
+
+def _seed_chars(words: Iterable[str]) -> str:
+    """A few characters such that every word contains at least one (greedy set cover)."""
+    remaining = set(words)
+    seeds = ""
+    while remaining:
+        seed = max(sorted(set("".join(remaining))), key=lambda c: sum(c in word for word in remaining))
+        seeds += seed
+        remaining = {word for word in remaining if seed not in word}
+    return seeds
+
+
+# Fallback when ahocorasick isn't installed: one precompiled pattern finds
+# every keyword (the lookahead lets matches overlap), and lines containing
+# none of the seed characters can't hold a keyword, so they skip the regex
+_KEYWORD_RE = re.compile("(?=(" + "|".join(re.escape(word) for word in sorted(_ALL_KEYWORDS)) + "))")
+_KEYWORD_SEED_CHARS = _seed_chars(_ALL_KEYWORDS)
+
+
+def _find_keywords(text_lower: str) -> Set[str]:
+    """Return every keyword contained in an already-lowercased text, in one pass."""
+    automaton = _get_severity_automaton()
+    if automaton is not None:
+        return {word for _, word in automaton.iter(text_lower)}
+    if not any(seed in text_lower for seed in _KEYWORD_SEED_CHARS):
+        return set()
+    return set(_KEYWORD_RE.findall(text_lower))
+
+
+def _is_response_format_error(error: openai.BadRequestError) -> bool:
+    """Whether a 400 is the model rejecting response_format (and not e.g. a too long prompt)."""
+    if error.param:
+        return error.param.split(".")[0] == "response_format"
+    return "response_format" in (error.message or "")
+
 
 class ReviewService:
     """Service for AI-powered code review."""
@@ -9,9 +250,20 @@ class ReviewService:
     def __init__(self):
         self.model = settings.model_name
         self.temperature = 0.3  # Lower = more focused, deterministic
+        
+        # Cap parallel per-file reviews to stay within OpenAI rate limits
+        self._semaphore = asyncio.Semaphore(settings.review_max_concurrency)
+        
+        # Structured JSON reviews; switched off if the model rejects response_format
+        self._json_mode = True
     
     
-    def review_pr_diff(self, diff: str, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def review_pr_diff(
+        self,
+        diff: str,
+        files: List[Dict[str, Any]],
+        on_issue: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
         """
         Main review function - analyzes PR diff and returns feedback.
         
@@ -24,103 +276,402 @@ class ReviewService:
         Args:
             diff: The git diff showing code changes
             files: List of files changed (metadata)
+            on_issue: Optional callback, called with each issue as the AI reports it
             
         Returns:
             Dictionary with review feedback
         """
         
+        # Same inputs reviewed recently? Return that review as-is
+        cache_key = exact_review_cache.make_key(diff, files, self.model, self.temperature)
+        cached = exact_review_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         # Check if we should use real AI or mock (for testing)
         if not settings.openai_api_key:
-            print("⚠️  No OpenAI API key - using mock review")
+            logger.warning("⚠️  No OpenAI API key - using mock review")
             return self._mock_review_diff(diff, files)
         
         try:
+            # Reuse the review of a near-identical diff if we have one
+            if review_cache is not None:
+                cached = await review_cache.lookup(diff, files)
+                if cached is not None:
+                    exact_review_cache.set(cache_key, cached)
+                    return cached
+            
             # Use real AI review
-            return self._ai_review_diff(diff, files)
+            review, complete = await self._ai_review_diff(diff, files, on_issue)
+            
+            # A partial review isn't cached, so a re-run retries the failed chunks
+            if complete:
+                if review_cache is not None:
+                    await review_cache.store(diff, files, review)
+                exact_review_cache.set(cache_key, review)
+            return review
         except Exception as e:
-            print(f"❌ AI review failed: {e}")
+            logger.error("❌ AI review failed: %s", e)
             # Fallback to mock for safety
             return self._mock_review_diff(diff, files)
     
     
-    def _ai_review_diff(self, diff: str, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def stream_pr_review(
+        self, diff: str, files: List[Dict[str, Any]]
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Review a PR diff, yielding issues as soon as the AI reports them.
+        
+        LOGIC: Runs review_pr_diff() in the background and yields
+        ("issue", issue) events while the model is still writing,
+        then a final ("review", review) event with the complete review.
+        Cached and mock reviews only produce the final event.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        review_task = asyncio.ensure_future(self.review_pr_diff(diff, files, queue.put_nowait))
+        review_task.add_done_callback(lambda _: queue.put_nowait(None))
+        
+        try:
+            while (issue := await queue.get()) is not None:
+                yield "issue", issue
+            yield "review", review_task.result()
+        finally:
+            review_task.cancel()
+    
+    
+    async def _ai_review_diff(
+        self,
+        diff: str,
+        files: List[Dict[str, Any]],
+        on_issue: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Tuple[Dict[str, Any], bool]:
         """
         Use OpenAI to review the code diff.
         
+        LOGIC: Large PRs are split per file (and large files per group of
+        hunks) and the chunks are reviewed concurrently, so wall-clock time
+        is the slowest chunk, not the sum - and no part of the diff is dropped.
+        
+        Returns (review, complete). If some chunks failed, the review covers
+        the rest, its summary lists what wasn't reviewed and complete is False.
+        """
+        
+        chunks = self._chunk_diff(diff, files)
+        if len(chunks) == 1:
+            _, chunk_diff, chunk_files = chunks[0]
+            review = await self._ai_review_chunk(chunk_diff, chunk_files, on_issue)
+            return self._add_general_comment(review, files), True
+        
+        results = await asyncio.gather(
+            *[self._ai_review_chunk(chunk_diff, chunk_files, on_issue) for _, chunk_diff, chunk_files in chunks],
+            return_exceptions=True
+        )
+        
+        # Keep whatever chunks succeeded; only fail if all of them did
+        reviews = []
+        failed = []
+        for (label, _, _), result in zip(chunks, results):
+            if isinstance(result, Exception):
+                logger.error("❌ Review of %s failed: %s", label, result)
+                failed.append((label, result))
+            else:
+                reviews.append((label, result))
+        
+        if not reviews:
+            raise results[0]
+        
+        review = self._merge_reviews(reviews, failed)
+        return self._add_general_comment(review, files), not failed
+    
+    
+    async def _ai_review_chunk(
+        self,
+        diff: str,
+        files: List[Dict[str, Any]],
+        on_issue: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Review a single chunk of the diff with OpenAI.
+        
         LOGIC: Similar to your generate_code() but with different prompt.
         Instead of "create code", we ask "find issues in this code".
+        The completion is streamed; with JSON reviews (and ijson installed)
+        each issue is passed to on_issue as soon as its object closes,
+        otherwise once the chunk's review is parsed.
         """
         
         # Build the prompt for AI
         prompt = self._build_review_prompt(diff, files)
         
+        messages = [
+            {
+                "role": "system", 
+                "content": _REVIEW_SYSTEM_PROMPT
+            },
+            {
+                "role": "user", 
+                "content": prompt
+            }
+        ]
+        
         # Call OpenAI API
-        response = client.chat.completions.create(
+        async with self._semaphore:
+            json_mode = self._json_mode
+            try:
+                response = await self._create_review_completion(messages, json_mode)
+            except openai.BadRequestError as e:
+                if not json_mode or not _is_response_format_error(e):
+                    raise
+                # Older models (e.g. gpt-4) don't support structured outputs
+                logger.warning("⚠️  %s rejected JSON review format, using text reviews: %s", self.model, e)
+                self._json_mode = json_mode = False
+                response = await self._create_review_completion(messages, json_mode)
+            
+            # Collect AI's response, parsing issues out of the JSON as it arrives
+            issue_parser = None
+            if on_issue is not None and json_mode and ijson is not None:
+                parsed_items = ijson.sendable_list()
+                issue_parser = ijson.items_coro(parsed_items, "issues.item")
+            
+            parts = []
+            try:
+                async for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content or ""
+                    parts.append(delta)
+                    if issue_parser is not None and delta:
+                        try:
+                            issue_parser.send(delta.encode())
+                        except ijson.JSONError:
+                            issue_parser = None  # Not valid JSON; issues come from the final parse
+                            continue
+                        for item in parsed_items:
+                            self._emit_issue(item, files, on_issue)
+                        del parsed_items[:]
+            finally:
+                await response.close()
+        
+        review_text = "".join(parts).strip()
+        
+        # Parse the response into structured format
+        review = self._parse_json_review(review_text, files) if json_mode else None
+        if review is None:
+            review = self._parse_ai_response(review_text, files)
+            issue_parser = None
+        
+        # Issues weren't streamed, report them now that the chunk is done
+        if on_issue is not None and issue_parser is None:
+            for issue in review["issues"]:
+                on_issue(issue)
+        
+        return review
+    
+    
+    def _emit_issue(
+        self,
+        item: Any,
+        files: List[Dict[str, Any]],
+        on_issue: Callable[[Dict[str, Any]], None]
+    ) -> None:
+        """Validate one streamed issue and pass it on if it's for a file in this chunk."""
+        try:
+            issue = ReviewIssue.model_validate(item)
+        except ValidationError:
+            return
+        
+        if not files or any(f["filename"] == issue.file for f in files):
+            on_issue(issue.model_dump())
+    
+    
+    async def _create_review_completion(self, messages: List[Dict[str, str]], json_mode: bool) -> Any:
+        """Start a streamed review request, as structured JSON output or free text."""
+        if json_mode:
+            return await create_chat_completion(
+                model=self.model,
+                messages=messages,
+                temperature=0,
+                response_format=_get_review_response_format(),
+                stream=True
+            )
+        return await create_chat_completion(
             model=self.model,
-            messages=[
-                {
-                    "role": "system", 
-                    "content": """You are an expert code reviewer. Analyze code changes and identify:
-                    1. Bugs and logic errors
-                    2. Security vulnerabilities
-                    3. Performance issues
-                    4. Best practice violations
-                    5. Code style issues
-                    
-                    Provide specific, actionable feedback with line numbers when possible.
-                    Be constructive and helpful in your tone."""
-                },
-                {
-                    "role": "user", 
-                    "content": prompt
-                }
-            ],
-            temperature=self.temperature
+            messages=messages,
+            temperature=self.temperature,
+            stream=True
         )
+    
+    
+    def _split_diff_by_file(self, diff: str) -> List[Tuple[str, str]]:
+        """
+        Split a unified diff into (filename, file_diff) pairs.
         
-        # Extract AI's response
-        review_text = response.choices[0].message.content.strip()
+        LOGIC: Every file section starts with a "diff --git a/... b/..." header.
+        """
+        file_diffs = []
+        for section in _DIFF_FILE_RE.split(diff):
+            header = _DIFF_HEADER_RE.match(section)
+            if header:
+                file_diffs.append((header.group(1), section))
+        return file_diffs
+    
+    
+    def _chunk_diff(
+        self, diff: str, files: List[Dict[str, Any]]
+    ) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+        """
+        Split a diff into (label, chunk_diff, chunk_files) review units.
         
-        # Parse the response into structured format
-        return self._parse_ai_response(review_text, files)
+        LOGIC: One unit per file, or several if the file's diff is larger
+        than _MAX_CHUNK_TOKENS. Each unit only carries its own file's metadata.
+        """
+        file_diffs = self._split_diff_by_file(diff)
+        if not file_diffs:
+            # Not a git diff - just split it by size
+            return [("diff", part, files) for part in self._pack_hunks(diff)]
+        
+        chunks = []
+        for filename, file_diff in file_diffs:
+            chunk_files = [f for f in files if f["filename"] == filename] or files
+            parts = self._pack_hunks(file_diff)
+            for i, part in enumerate(parts, 1):
+                label = filename if len(parts) == 1 else f"{filename} (part {i}/{len(parts)})"
+                chunks.append((label, part, chunk_files))
+        return chunks
+    
+    
+    def _pack_hunks(self, file_diff: str) -> List[str]:
+        """
+        Split one file's diff into pieces of at most _MAX_CHUNK_TOKENS.
+        
+        LOGIC: Pieces break between hunks and each repeats the file header,
+        so every piece is still a readable diff. A single hunk larger than
+        the budget (e.g. a whole new file) is split into consecutive token
+        windows, each a piece of its own - nothing is dropped. The header
+        and all hunks are tokenized in one batched call and sizes are
+        counted on the model's own tokens.
+        """
+        encoder = _get_encoder()
+        header, *hunks = _DIFF_HUNK_RE.split(file_diff)
+        if not hunks:
+            tokens = encoder.encode_ordinary(file_diff)
+            return [
+                encoder.decode(tokens[i:i + _MAX_CHUNK_TOKENS])
+                for i in range(0, len(tokens), _MAX_CHUNK_TOKENS)
+            ] or [file_diff]
+        
+        header_tokens, *hunk_tokens = encoder.encode_ordinary_batch([header] + hunks)
+        if len(header_tokens) > _MAX_CHUNK_TOKENS // 2:
+            header_tokens = header_tokens[:_MAX_CHUNK_TOKENS // 2]
+            header = encoder.decode(header_tokens)
+        budget = _MAX_CHUNK_TOKENS - len(header_tokens)
+        
+        parts = []
+        current = ""
+        current_tokens = 0
+        for hunk, tokens in zip(hunks, hunk_tokens):
+            if len(tokens) > budget:
+                if current:
+                    parts.append(header + current)
+                    current = ""
+                    current_tokens = 0
+                parts.extend(
+                    header + encoder.decode(tokens[i:i + budget])
+                    for i in range(0, len(tokens), budget)
+                )
+                continue
+            if current and current_tokens + len(tokens) > budget:
+                parts.append(header + current)
+                current = ""
+                current_tokens = 0
+            current += hunk
+            current_tokens += len(tokens)
+        if current:
+            parts.append(header + current)
+        return parts
+    
+    
+    def _merge_reviews(
+        self,
+        reviews: List[Tuple[str, Dict[str, Any]]],
+        failed: List[Tuple[str, Exception]]
+    ) -> Dict[str, Any]:
+        """Combine per-file reviews into one review, noting chunks whose review failed."""
+        summary = "\n\n".join(f"### {filename}\n\n{review['summary']}" for filename, review in reviews)
+        if failed:
+            summary += "\n\n" + "\n".join(
+                f"⚠️ Not reviewed: {label} ({type(error).__name__})" for label, error in failed
+            )
+        
+        # The PR as a whole is as bad as its worst chunk
+        assessment = min(
+            (review["overall_assessment"] for _, review in reviews),
+            key=lambda a: _ASSESSMENT_ORDER.index(a) if a in _ASSESSMENT_ORDER else len(_ASSESSMENT_ORDER)
+        )
+        
+        return {
+            "summary": summary,
+            "issues": [issue for _, review in reviews for issue in review["issues"]],
+            "overall_assessment": assessment
+        }
+    
+    
+    def _add_general_comment(self, review: Dict[str, Any], files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        If no specific issues were found, add one general comment.
+        
+        LOGIC: Done once for the whole review, after chunk reviews are
+        merged - not per chunk, which gave one placeholder per clean file.
+        """
+        if not review["issues"] and files:
+            review["issues"].append({
+                "file": files[0]["filename"],
+                "line": 1,
+                "message": review["summary"][:200] + "...",  # First 200 chars
+                "severity": "info"
+            })
+        return review
     
     
     def _build_review_prompt(self, diff: str, files: List[Dict[str, Any]]) -> str:
         """
         Build the prompt for AI review.
         
-        LOGIC: Create clear instructions for the AI
-        Include the diff and context about files changed
+        LOGIC: Include the diff and context about files changed.
+        The review instructions live in _REVIEW_SYSTEM_PROMPT, so this
+        only fills the per-PR content into the _PROMPT_TMPL template.
         """
         
-        # Get file names
-        file_names = [f["filename"] for f in files]
+        # The diff is already split into chunks of at most _MAX_CHUNK_TOKENS
+        return _PROMPT_TMPL.format(files=", ".join(f["filename"] for f in files), diff=diff)
+    
+    
+    def _parse_json_review(self, review_text: str, files: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Turn a structured (JSON) AI review into our review format.
         
-        prompt = f"""
-Please review the following code changes from a Pull Request.
-
-**Files Changed:**
-{', '.join(file_names)}
-
-**Code Diff:**
-```
-{diff[:4000]}  # Limit to first 4000 chars to stay within token limits
-```
-
-**Review Focus:**
-- Identify any bugs or logic errors
-- Check for security vulnerabilities (SQL injection, XSS, etc.)
-- Note any performance concerns
-- Suggest improvements for readability/maintainability
-- Check adherence to best practices
-
-Please provide your feedback in a clear, structured format with:
-- Specific line numbers or file names when possible
-- Severity level (Critical/Major/Minor)
-- Actionable suggestions for improvement
-"""
+        Returns None if the output doesn't validate, so the caller
+        can fall back to the free-text parser.
+        """
+        try:
+            result = AIReviewResult.model_validate(orjson.loads(review_text))
+        except (orjson.JSONDecodeError, ValidationError) as e:
+            logger.warning("⚠️  Invalid JSON review, falling back to text parsing: %s", e)
+            return None
+        
+        # GitHub only accepts inline comments on files in the PR
+        known_files = {f["filename"] for f in files}
+        issues = [
+            issue.model_dump()
+            for issue in result.issues
+            if not known_files or issue.file in known_files
+        ]
         
-        return prompt
+        return {
+            "summary": result.summary,
+            "issues": issues,
+            "overall_assessment": _JSON_ASSESSMENTS[result.overall_assessment]
+        }
     
     
     def _parse_ai_response(self, review_text: str, files: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -137,52 +688,83 @@ Please provide your feedback in a clear, structured format with:
         # For now, return a simple structure
         # In production, you'd parse more carefully to extract line numbers
         
+        issues, keywords = self._extract_issues(review_text, files)
+        
         return {
             "summary": review_text,
-            "issues": self._extract_issues(review_text, files),
-            "overall_assessment": self._get_overall_assessment(review_text)
+            "issues": issues,
+            "overall_assessment": self._assessment_from_keywords(keywords)
         }
     
     
-    def _extract_issues(self, review_text: str, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _extract_issues(
+        self, review_text: str, files: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Set[str]]:
         """
         Extract individual issues from AI's review.
         
         LOGIC: Parse the text to find specific issues
         In a real implementation, you'd use regex or ask AI for JSON
+        
+        Each line is lowercased and keyword-scanned once; the keywords
+        seen across all lines are returned too, for the overall assessment.
         """
         
         issues = []
+        all_keywords: Set[str] = set()
+        
+        # Hot-loop lookups bound to locals once
+        append_issue = issues.append
+        update_keywords = all_keywords.update
+        match_file = self._match_file
+        severity_from_keywords = self._severity_from_keywords
+        
+        # Lowercased filename -> (position in files, original filename), built once
+        name_index: Dict[str, Tuple[int, str]] = {}
+        for position, file_info in enumerate(files):
+            name_index.setdefault(file_info["filename"].lower(), (position, file_info["filename"]))
+        filename_automaton = _build_automaton(name_index)
         
         # Simple parsing - look for lines mentioning file names
         # This is basic - you can improve it!
         lines = review_text.split('\n')
         
         for line in lines:
+            line_lower = line.lower()
+            keywords = _find_keywords(line_lower)
+            update_keywords(keywords)
+            
             # Example: if AI mentions a file and "line X"
-            for file_info in files:
-                filename = file_info["filename"]
-                if filename in line.lower():
-                    # Found an issue related to this file
-                    issue = {
-                        "file": filename,
-                        "line": 1,  # Default to line 1 (improve with regex)
-                        "message": line.strip(),
-                        "severity": self._detect_severity(line)
-                    }
-                    issues.append(issue)
-                    break
-        
-        # If no specific issues found, create a general comment
-        if not issues and files:
-            issues.append({
-                "file": files[0]["filename"],
-                "line": 1,
-                "message": review_text[:200] + "...",  # First 200 chars
-                "severity": "info"
-            })
+            filename = match_file(line_lower, name_index, filename_automaton)
+            if filename:
+                # Found an issue related to this file
+                append_issue({
+                    "file": filename,
+                    "line": 1,  # Default to line 1 (improve with regex)
+                    "message": line.strip(),
+                    "severity": severity_from_keywords(keywords)
+                })
+        
+        return issues, all_keywords
+    
+    
+    def _match_file(
+        self, line_lower: str, name_index: Dict[str, Tuple[int, str]], automaton
+    ) -> Optional[str]:
+        """
+        Return the filename mentioned in a line (earliest in the files list wins).
         
-        return issues
+        LOGIC: One automaton pass finds every mentioned filename at once,
+        instead of a substring scan per file.
+        """
+        if automaton is not None:
+            matches = [name_index[name] for _, name in automaton.iter(line_lower)]
+            return min(matches)[1] if matches else None
+        
+        for name, (_, filename) in name_index.items():
+            if name in line_lower:
+                return filename
+        return None
     
     
     def _detect_severity(self, text: str) -> str:
@@ -191,13 +773,16 @@ Please provide your feedback in a clear, structured format with:
         
         LOGIC: Look for keywords indicating severity
         """
-        text_lower = text.lower()
-        
-        if any(word in text_lower for word in ['critical', 'security', 'vulnerable', 'exploit']):
+        return self._severity_from_keywords(_find_keywords(text.lower()))
+    
+    
+    def _severity_from_keywords(self, keywords: Set[str]) -> str:
+        """Map the keywords found in one line to a severity level."""
+        if keywords & _CRITICAL_WORDS:
             return 'critical'
-        elif any(word in text_lower for word in ['major', 'bug', 'error', 'broken']):
+        elif keywords & _MAJOR_WORDS:
             return 'major'
-        elif any(word in text_lower for word in ['minor', 'style', 'formatting', 'suggestion']):
+        elif keywords & _MINOR_WORDS:
             return 'minor'
         else:
             return 'info'
@@ -209,20 +794,21 @@ Please provide your feedback in a clear, structured format with:
         
         LOGIC: Based on what AI found, is this PR good or needs work?
         """
-        text_lower = review_text.lower()
-        
-        critical_issues = ['critical', 'security', 'vulnerable', 'broken']
-        if any(word in text_lower for word in critical_issues):
-            return "❌ Changes need attention - critical issues found"
+        return self._assessment_from_keywords(_find_keywords(review_text.lower()))
+    
+    
+    def _assessment_from_keywords(self, keywords: Set[str]) -> str:
+        """Map the keywords found anywhere in a review to an overall assessment."""
+        if keywords & _ASSESSMENT_CRITICAL_WORDS:
+            return _ASSESSMENT_CRITICAL
         
-        major_issues = ['major', 'bug', 'error']
-        if any(word in text_lower for word in major_issues):
-            return "⚠️ Good start, but some issues need fixing"
+        if keywords & _ASSESSMENT_MAJOR_WORDS:
+            return _ASSESSMENT_NEEDS_WORK
         
-        if 'looks good' in text_lower or 'lgtm' in text_lower:
-            return "✅ Changes look good!"
+        if keywords & _ASSESSMENT_GOOD_WORDS:
+            return _ASSESSMENT_GOOD
         
-        return "💬 Review completed - see comments for details"
+        return _ASSESSMENT_COMMENT
     
     
     def _mock_review_diff(self, diff: str, files: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -233,17 +819,18 @@ Please provide your feedback in a clear, structured format with:
         so you can test the rest of the system.
         """
         
-        print("🤖 Using mock review (no API key)")
+        logger.info("🤖 Using mock review (no API key)")
         
-        # Create fake review data
-        mock_issues = []
-        for file_info in files[:2]:  # Review first 2 files
-            mock_issues.append({
+        # Create fake review data for the first 2 files
+        mock_issues = [
+            {
                 "file": file_info["filename"],
                 "line": 1,
                 "message": f"✅ Mock review: {file_info['filename']} looks good! (This is a test comment)",
                 "severity": "info"
-            })
+            }
+            for file_info in files[:2]
+        ]
         
         return {
             "summary": "🤖 This is a MOCK review for testing. Enable OpenAI API for real reviews.\n\nThe code changes look reasonable in this test review.",
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List
+
+try:
+    import tiktoken
+except ImportError:  # Optional - token counts are then estimated from length
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Rough characters per token, used when no tiktoken encoding is available
+_CHARS_PER_TOKEN = 4
+# Chat-format overhead per message (role and separators)
+_TOKENS_PER_MESSAGE = 4
+# Seconds before a failed encoding load is tried again
+_RETRY_SECONDS = 300
+# Seconds app startup waits for the encoding to load
+_WARM_TIMEOUT_SECONDS = 10
+
+# Loaded encodings, and when loading one last failed, per model
+_encoders: Dict[str, Any] = {}
+_failed_at: Dict[str, float] = {}
+_load_lock = threading.Lock()
+
+
+class ApproxEncoder:
+    """Stand-in for a tiktoken encoding: every _CHARS_PER_TOKEN characters count as one token."""
+
+    def encode_ordinary(self, text: str) -> List[str]:
+        return [text[i:i + _CHARS_PER_TOKEN] for i in range(0, len(text), _CHARS_PER_TOKEN)]
+
+    def encode_ordinary_batch(self, texts: List[str]) -> List[List[str]]:
+        return [self.encode_ordinary(text) for text in texts]
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+def load_encoder(model: str):
+    """
+    Load (and cache) the tiktoken encoding for a model - blocking.
+
+    LOGIC: tiktoken may have to download the BPE file, with no timeout,
+    so this must not run on the event loop (see warm_encoder). A failed
+    load returns an ApproxEncoder and is retried after _RETRY_SECONDS
+    instead of pinning the approximation for the life of the process.
+    """
+    if tiktoken is None:
+        return ApproxEncoder()
+    with _load_lock:
+        if model in _encoders:
+            return _encoders[model]
+        try:
+            try:
+                encoder = tiktoken.encoding_for_model(model)
+            except KeyError:  # Model tiktoken doesn't know yet
+                encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:  # e.g. BPE file can't be downloaded
+            logger.warning("⚠️  No tiktoken encoding for %s, estimating tokens from length: %s", model, e)
+            _failed_at[model] = time.monotonic()
+            return ApproxEncoder()
+        _encoders[model] = encoder
+        _failed_at.pop(model, None)
+        return encoder
+
+
+async def warm_encoder(model: str) -> None:
+    """
+    Load a model's encoding in a worker thread, e.g. on app startup.
+
+    Gives up waiting after _WARM_TIMEOUT_SECONDS so a hanging download
+    doesn't block startup; the load carries on in its thread.
+    """
+    try:
+        await asyncio.wait_for(asyncio.to_thread(load_encoder, model), _WARM_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning("⚠️  Loading the %s tokenizer is slow, estimating tokens until it's ready", model)
+
+
+def get_encoder(model: str):
+    """
+    Tokenizer for a model, or an approximation until tiktoken can provide one.
+
+    LOGIC: Never blocks - if the encoding isn't loaded yet it's loaded in
+    a background thread (at most one at a time, failures retried after
+    _RETRY_SECONDS) and the ApproxEncoder is used meanwhile.
+    """
+    encoder = _encoders.get(model)
+    if encoder is not None:
+        return encoder
+    if tiktoken is not None and not _load_lock.locked():
+        failed_at = _failed_at.get(model)
+        if failed_at is None or time.monotonic() - failed_at >= _RETRY_SECONDS:
+            threading.Thread(target=load_encoder, args=(model,), daemon=True).start()
+    return ApproxEncoder()
+
+
+def count_message_tokens(messages: Iterable[Dict[str, Any]], model: str) -> int:
+    """Count the prompt tokens of a chat request's messages."""
+    encoder = get_encoder(model)
+    return sum(
+        len(encoder.encode_ordinary(message.get("content") or "")) + _TOKENS_PER_MESSAGE
+        for message in messages
+    )
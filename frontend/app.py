@@ -1,86 +1,182 @@
 import gradio as gr
 import requests
+import functools
+import orjson
+import zstandard
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from frontend.components.ui_components import create_header, create_section_divider, clear_inputs
+from frontend.components.ui_components import create_header, create_section_divider, clear_inputs, format_issue
 
 # Backend API configuration
 BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
 
+# Direct mode: the UI runs inside the backend process (mounted by backend/app.py)
+# and calls the services in-process instead of going through the HTTP API
+DIRECT_MODE = os.getenv("DIRECT_MODE", "false").lower() == "true"
+
+# (connect, read) timeouts; reviews of large PRs can take a while before the first event
+REQUEST_TIMEOUT = (3, 120)
+REVIEW_TIMEOUT = (3, 300)
+
+# One pooled session, so button presses reuse keep-alive connections to the backend
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=Retry(total=3, backoff_factor=0.2))
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_ZSTD_JSON_HEADERS = {"Content-Type": "application/json", "Content-Encoding": "zstd"}
+
+# Bodies at least this large are sent zstd-compressed
+COMPRESS_MIN_BYTES = 1024
+_compressor = zstandard.ZstdCompressor(level=3)
+
+def _post(path, payload, **kwargs):
+    """POSTs an orjson-encoded (and, if large, zstd-compressed) body to the backend."""
+    body = orjson.dumps(payload)
+    if len(body) >= COMPRESS_MIN_BYTES:
+        return SESSION.post(f"{BACKEND_URL}{path}", data=_compressor.compress(body), headers=_ZSTD_JSON_HEADERS, **kwargs)
+    return SESSION.post(f"{BACKEND_URL}{path}", data=body, headers=_JSON_HEADERS, **kwargs)
+
 def generate_code(query, language):
-    """Generates code based on user input and language preference."""
+    """Generates code based on user input and language preference, showing it as it's written."""
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/generate-code",
-            json={"query": query, "language": language}
-        )
-        response.raise_for_status()
-        return response.json()["code"]
+        with _post(
+            "/generate-code/stream",
+            {"query": query, "language": language},
+            stream=True,
+            timeout=REQUEST_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            code = ""
+            for text in response.iter_content(chunk_size=None, decode_unicode=True):
+                code += text
+                yield code
     except Exception as e:
-        return f"Error: {str(e)}"
+        yield f"Error: {str(e)}"
 
 def generate_unit_tests(code, language):
     """Generates unit tests for the provided code."""
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/generate-tests",
-            json={"code": code, "language": language}
+        response = _post(
+            "/generate-tests",
+            {"code": code, "language": language},
+            timeout=REQUEST_TIMEOUT
         )
         response.raise_for_status()
-        return response.json()["tests"]
+        return orjson.loads(response.content)["tests"]
     except Exception as e:
         return f"Error: {str(e)}"
 
 def generate_documentation(code, language):
     """Generates documentation in the form of docstrings for classes and functions."""
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/generate-documentation",
-            json={"code": code, "language": language}
+        response = _post(
+            "/generate-documentation",
+            {"code": code, "language": language},
+            timeout=REQUEST_TIMEOUT
         )
         response.raise_for_status()
-        return response.json()["documentation"]
+        return orjson.loads(response.content)["documentation"]
     except Exception as e:
         return f"Error: {str(e)}"
 
+def generate_tests_and_docs(code, language):
+    """Generates unit tests and documentation for the provided code in one request."""
+    try:
+        response = _post(
+            "/generate-tests-and-docs",
+            {"code": code, "language": language},
+            timeout=REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+        result = orjson.loads(response.content)
+        return result["tests"], result["documentation"]
+    except Exception as e:
+        return f"Error: {str(e)}", f"Error: {str(e)}"
+
 def copy_to_clipboard(code):
     """Copies the generated code to the clipboard."""
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/copy-to-clipboard",
-            json={"code": code}
+        response = _post(
+            "/copy-to-clipboard",
+            {"code": code},
+            timeout=REQUEST_TIMEOUT
         )
         response.raise_for_status()
-        return response.json()["message"]
+        return orjson.loads(response.content)["message"]
     except Exception as e:
         return f"Error: {str(e)}"
 
 def save_to_file(code, language):
     """Saves the generated code to a file with the correct extension."""
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/save-to-file",
-            json={"code": code, "language": language}
+        response = _post(
+            "/save-to-file",
+            {"code": code, "language": language},
+            timeout=REQUEST_TIMEOUT
         )
         response.raise_for_status()
-        return response.json()["message"]
+        return orjson.loads(response.content)["message"]
     except Exception as e:
         return f"Error: {str(e)}"
 
+def _iter_sse(response):
+    """Yields (event, data) pairs from a Server-Sent Events response."""
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield event, orjson.loads(line[len("data: "):])
+
+def review_pr(pr_url):
+    """Reviews a GitHub PR, showing issues as soon as the AI reports them."""
+    try:
+        with SESSION.post(
+            f"{BACKEND_URL}/review/pr/stream",
+            params={"pr_url": pr_url},
+            stream=True,
+            timeout=REVIEW_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            lines = ["⏳ Reviewing...", ""]
+            for event, data in _iter_sse(response):
+                if event == "issue":
+                    lines.append(format_issue(data))
+                elif event == "review":
+                    lines = [f"### {data['overall_assessment']}", "", data["summary"], ""]
+                    lines += [format_issue(issue) for issue in data["issues"]]
+                elif event == "done":
+                    lines += ["", "✅ Review posted to GitHub" if data["posted"] else "❌ Failed to post review"]
+                yield "\n".join(lines)
+    except Exception as e:
+        yield f"Error: {str(e)}"
+
+if DIRECT_MODE:
+    from frontend.direct import (
+        generate_code, generate_unit_tests, generate_documentation, generate_tests_and_docs,
+        copy_to_clipboard, save_to_file, review_pr
+    )
+
 # Load custom CSS
+@functools.cache
 def load_custom_css():
-    """Load custom CSS from file."""
+    """Load custom CSS from file (read once per process)."""
     try:
-        with open("frontend/static/styles.css", "r") as f:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "styles.css"), "r") as f:
             return f.read()
     except FileNotFoundError:
         return ""
 
+CUSTOM_CSS = load_custom_css()
+
 # Create the enhanced Gradio interface
 with gr.Blocks(
-    css=load_custom_css(),
+    css=CUSTOM_CSS,
     title="🚀 Advanced AI Code Generator"
 ) as ui:
     
@@ -110,6 +206,7 @@ with gr.Blocks(
         generate_button = gr.Button("🚀 Generate Code", variant="primary", size="lg")
         test_button = gr.Button("🧪 Generate Unit Tests", variant="secondary")
         doc_button = gr.Button("📚 Generate Documentation", variant="secondary")
+        both_button = gr.Button("🧪+📚 Generate Both", variant="secondary")
     
     with gr.Row():
         copy_button = gr.Button("📋 Copy Code", variant="secondary")
@@ -150,14 +247,28 @@ with gr.Blocks(
         interactive=False,
         lines=2
     )
+    
+    create_section_divider()
+    
+    gr.Markdown("### 🔍 GitHub PR Review")
+    with gr.Row():
+        pr_url = gr.Textbox(
+            label="🔗 Pull Request URL",
+            placeholder="https://github.com/owner/repo/pull/123",
+            scale=3
+        )
+        review_button = gr.Button("🔍 Review PR", variant="primary", scale=1)
+    review_output = gr.Markdown()
 
     # Event handlers - preserving all original functionality
     generate_button.click(generate_code, inputs=[query, language], outputs=output)
     test_button.click(generate_unit_tests, inputs=[output, language], outputs=unit_test_output)
     doc_button.click(generate_documentation, inputs=[output, language], outputs=doc_output)
+    both_button.click(generate_tests_and_docs, inputs=[output, language], outputs=[unit_test_output, doc_output])
     copy_button.click(copy_to_clipboard, inputs=[output], outputs=status)
     save_button.click(save_to_file, inputs=[output, language], outputs=status)
     clear_button.click(clear_inputs, inputs=[], outputs=[query, language, output, unit_test_output, doc_output])
+    review_button.click(review_pr, inputs=[pr_url], outputs=review_output)
 
 # Launch with enhanced settings
 if __name__ == "__main__":
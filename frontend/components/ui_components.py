@@ -19,3 +19,7 @@ def create_section_divider():
 def clear_inputs():
     """Clear all inputs and outputs."""
     return "", "python", "", "", ""
+
+def format_issue(issue):
+    """Format one review issue as a markdown list item."""
+    return f"- **{issue['severity']}** `{issue['file']}:{issue['line']}` {issue['message']}"
@@ -0,0 +1,120 @@
+"""
+In-process UI handlers, used when the Gradio UI is mounted on the backend.
+
+Same inputs and outputs as the HTTP handlers in frontend/app.py, but the
+backend services are called directly instead of through the API.
+"""
+import asyncio
+
+from backend.services.aicode_service import stream_code
+from backend.services.aicode_service import generate_unit_tests as _generate_unit_tests
+from backend.services.aicode_service import generate_documentation as _generate_documentation
+from backend.services.file_handler import copy_to_clipboard as _copy_to_clipboard
+from backend.services.file_handler import save_to_file as _save_to_file
+from backend.services.cache import response_cache
+from backend.services.git_service import github_service
+from backend.services.review_service import review_service
+from frontend.components.ui_components import format_issue
+
+async def _tests(code, language):
+    """Unit tests, sharing the /generate-tests cache."""
+    tests, _ = await response_cache.get_or_generate(
+        "generate-tests", language, code,
+        lambda: _generate_unit_tests(code, language)
+    )
+    return tests
+
+async def _docs(code, language):
+    """Documentation, sharing the /generate-documentation cache."""
+    documentation, _ = await response_cache.get_or_generate(
+        "generate-documentation", language, code,
+        lambda: _generate_documentation(code, language)
+    )
+    return documentation
+
+async def generate_code(query, language):
+    """Generates code based on user input and language preference, showing it as it's written."""
+    try:
+        chunks, _ = await response_cache.get_or_stream(
+            "generate-code", language, query,
+            lambda: stream_code(query, language)
+        )
+        code = ""
+        async for text in chunks:
+            code += text
+            yield code
+    except Exception as e:
+        yield f"Error: {str(e)}"
+
+async def generate_unit_tests(code, language):
+    """Generates unit tests for the provided code."""
+    try:
+        return await _tests(code, language)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+async def generate_documentation(code, language):
+    """Generates documentation in the form of docstrings for classes and functions."""
+    try:
+        return await _docs(code, language)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+async def generate_tests_and_docs(code, language):
+    """Generates unit tests and documentation for the provided code concurrently."""
+    try:
+        tests, documentation = await asyncio.gather(_tests(code, language), _docs(code, language))
+        return tests, documentation
+    except Exception as e:
+        return f"Error: {str(e)}", f"Error: {str(e)}"
+
+async def copy_to_clipboard(code):
+    """Copies the generated code to the clipboard."""
+    try:
+        return await _copy_to_clipboard(code)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+async def save_to_file(code, language):
+    """Saves the generated code to a file with the correct extension."""
+    try:
+        return await _save_to_file(code, language or "txt")
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+async def review_pr(pr_url):
+    """Reviews a GitHub PR, showing issues as soon as the AI reports them."""
+    try:
+        pr = github_service.parse_pr_url(pr_url)
+        if pr is None:
+            yield "Error: Invalid PR URL format"
+            return
+        repo_owner, repo_name, pr_number = pr
+
+        lines = ["⏳ Reviewing...", ""]
+        yield "\n".join(lines)
+
+        pr_diff, pr_files = await asyncio.gather(
+            github_service.get_pr_diff(repo_owner, repo_name, pr_number),
+            github_service.get_pr_files(repo_owner, repo_name, pr_number)
+        )
+
+        review_feedback = None
+        async for event, data in review_service.stream_pr_review(pr_diff, pr_files):
+            if event == "issue":
+                lines.append(format_issue(data))
+            else:
+                review_feedback = data
+                lines = [f"### {data['overall_assessment']}", "", data["summary"], ""]
+                lines += [format_issue(issue) for issue in data["issues"]]
+            yield "\n".join(lines)
+
+        success = await github_service.post_pr_review(
+            repo_owner, repo_name, pr_number,
+            github_service.create_inline_comments(review_feedback),
+            review_feedback["summary"]
+        )
+        lines += ["", "✅ Review posted to GitHub" if success else "❌ Failed to post review"]
+        yield "\n".join(lines)
+    except Exception as e:
+        yield f"Error: {str(e)}"
@@ -3,6 +3,7 @@
 Script to start both backend and frontend services for the AI Code Generator.
 """
 
+import argparse
 import subprocess
 import time
 import sys
@@ -38,6 +39,13 @@ def check_env_file():
     print("   # Then edit .env file with your OpenAI API key")
     return True
 
+def uvicorn_server_options():
+    """uvicorn flags for the fast event loop (uvloop, not available on Windows) and C HTTP parser."""
+    options = ["--http", "httptools"]
+    if sys.platform != "win32":
+        options += ["--loop", "uvloop"]
+    return options
+
 def start_backend():
     """Start the FastAPI backend server."""
     print("🚀 Starting backend server...")
@@ -46,10 +54,52 @@ def start_backend():
         "backend.app:app", 
         "--host", "127.0.0.1", 
         "--port", "8000",
-        "--reload"
+        "--reload",
+        *uvicorn_server_options()
     ])
     return backend_process
 
+def start_combined():
+    """
+    Start one uvicorn server running the API with the Gradio UI mounted in-process.
+    
+    Always a single worker: Gradio keeps its session and queue state in
+    the process, so a UI spread over several workers breaks.
+    """
+    print("🚀 Starting backend with mounted UI...")
+    env = dict(os.environ, MOUNT_UI="true", DIRECT_MODE="true")
+    return subprocess.Popen([
+        sys.executable, "-m", "uvicorn",
+        "backend.app:app",
+        "--host", "127.0.0.1",
+        "--port", "8000",
+        "--workers", "1",
+        *uvicorn_server_options()
+    ], env=env)
+
+def run_combined():
+    """Run the API and mounted UI as a single service until Ctrl+C."""
+    try:
+        server_process = start_combined()
+        
+        print("\n✅ Service started successfully!")
+        print("🔗 Backend API: http://127.0.0.1:8000")
+        print("🎨 Frontend UI: http://127.0.0.1:8000/ui")
+        print("📚 API Docs: http://127.0.0.1:8000/docs")
+        print("\n⚠️  Press Ctrl+C to stop the service")
+        
+        try:
+            server_process.wait()
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping service...")
+            server_process.terminate()
+            server_process.wait()
+            print("✅ Service stopped successfully!")
+            
+    except Exception as e:
+        print(f"❌ Error starting service: {e}")
+        sys.exit(1)
+
 def start_frontend():
     """Start the Gradio frontend server."""
     print("🎨 Starting frontend server...")
@@ -60,6 +110,14 @@ def start_frontend():
 
 def main():
     """Main function to start both services."""
+    parser = argparse.ArgumentParser(description="Start the AI Code Generator services.")
+    parser.add_argument(
+        "--mount-ui", action="store_true",
+        help="Run a single uvicorn server (one worker) with the UI mounted at /ui "
+             "(instead of separate backend and frontend processes with auto-reload)"
+    )
+    args = parser.parse_args()
+    
     print("🔧 AI Code Generator - Service Starter")
     print("=" * 50)
     
@@ -70,6 +128,10 @@ def main():
     # Check environment file
     check_env_file()
     
+    if args.mount_ui:
+        run_combined()
+        return
+    
     try:
         # Start backend
         backend_process = start_backend()